@@ -0,0 +1,303 @@
+import datetime
+import hashlib
+import os
+import re
+import threading
+
+import pandas as pd
+
+import storage
+from db_build import AGGREGATES, DB_PATH, SCHEMA_VERSION, SOURCES, data_version, open_readonly
+from queries import explain
+
+# Set CRICSHEET_BACKEND to pick the engine the question catalog runs on
+BACKENDS = ('sqlite', 'duckdb')
+DEFAULT_BACKEND = 'sqlite'
+
+
+def _catalog_tables():
+    """{lower-case catalog table: (format, 'summary' / 'innings' / aggregate suffix)}"""
+    tables = {}
+    for table, (fmt, kind) in SOURCES.items():
+        tables[table.lower()] = (fmt, kind)
+        if kind == 'innings':
+            prefix = table.rsplit('_', 1)[0].lower()
+            tables.update({f'{prefix}_{suffix.lower()}': (fmt, suffix) for suffix in AGGREGATES})
+    return tables
+
+
+TABLES = _catalog_tables()
+
+
+def _literal(value):
+    return "'" + str(value).replace("'", "''") + "'"
+
+
+def window_condition(window):
+    """SQL condition on the summary columns selecting the matches of a window."""
+    terms = []
+    if window.seasons is not None:
+        terms.append(f'season IN ({", ".join(map(_literal, window.seasons))})' if window.seasons else '1 = 0')
+    if window.start:
+        terms.append(f'start_date >= {_literal(window.start)}')
+    if window.end:
+        terms.append(f'start_date < {_literal(window.end + datetime.timedelta(days=1))}')
+    return ' AND '.join(terms) or '1 = 1'
+
+
+def windowed(sql, ctes):
+    """Prefix ``sql`` with CTEs, named like the catalog tables they replace."""
+    if not ctes:
+        return sql
+    head = ', '.join(f'{name} AS ({body})' for name, body in ctes)
+    match = re.match(r'\s*WITH\s', sql, re.I)
+    return f'WITH {head}, {sql[match.end():]}' if match else f'WITH {head} {sql}'
+
+
+def _formats(sql):
+    """{format: {summary / innings / aggregate suffixes}} referenced by a statement."""
+    used = {}
+    for word in set(re.findall(r'\w+', sql.lower())):
+        if word in TABLES:
+            fmt, kind = TABLES[word]
+            used.setdefault(fmt, set()).add(kind)
+    return used
+
+
+def _name(fmt, kind):
+    return next(t for t, v in TABLES.items() if v == (fmt, kind))
+
+
+class SQLiteBackend:
+    """The catalog on the SQLite database built by db_build (the default)."""
+    name = 'sqlite'
+
+    def __init__(self, db_path=DB_PATH, pool_size=8):
+        self.engine = open_readonly(db_path, pool_size)
+
+    def read_sql(self, sql, params=None, window=None):
+        if window:
+            sql = self.restrict(sql, window)
+        return pd.read_sql_query(sql, con=self.engine, params=params)
+
+    def restrict(self, sql, window):
+        """Rewrite a catalog statement to see only the matches of ``window``.
+
+        Every catalog table it reads is shadowed by a CTE over the real
+        table (``main.<name>``) keeping the window's match ids, which the
+        season and start_date indexes of the summary tables select.
+        """
+        ctes = []
+        for fmt, kinds in _formats(sql).items():
+            summary = _name(fmt, 'summary')
+            ctes.append((summary, f'SELECT * FROM main.{summary} WHERE {window_condition(window)}'))
+            for kind in sorted(kinds - {'summary'}):
+                name = _name(fmt, kind)
+                ctes.append((name, f'SELECT * FROM main.{name} WHERE match_id IN (SELECT match_id FROM {summary})'))
+        return windowed(sql, ctes)
+
+    def explain(self, sql):
+        return explain(self.engine, sql)
+
+    def index_stats(self):
+        """Return {table or index: (table, [rows, rows per key prefix, ...])} from sqlite_stat1."""
+        with self.engine.connect() as conn:
+            if not conn.exec_driver_sql("SELECT 1 FROM sqlite_master WHERE name = 'sqlite_stat1'").fetchone():
+                return {}
+            rows = conn.exec_driver_sql('SELECT tbl, idx, stat FROM sqlite_stat1').fetchall()
+        stats = {}
+        for tbl, idx, stat in rows:
+            numbers = [int(x) for x in stat.split() if x.isdigit()]
+            if numbers:
+                stats[(idx or tbl).lower()] = (tbl.lower(), numbers)
+                stats.setdefault(tbl.lower(), (tbl.lower(), numbers[:1]))
+        return stats
+
+    def tables(self):
+        """Lower-case names of the catalog tables that were built."""
+        with self.engine.connect() as conn:
+            rows = conn.exec_driver_sql("SELECT name FROM sqlite_master WHERE type = 'table'").fetchall()
+        return {name.lower() for name, in rows} & set(TABLES)
+
+    def version(self):
+        return data_version(self.engine)
+
+    def dispose(self):
+        self.engine.dispose()
+
+
+def _columns(ddl):
+    """Return [(name, type)] from the column definitions of a CREATE TABLE."""
+    ddl = re.sub(r'PRIMARY KEY\s*\([^)]*\)', '', ddl, flags=re.I)
+    return [(words[0], words[1].upper()) for words in map(str.split, ddl.split(',')) if words]
+
+
+def _aggregate(suffix, innings):
+    """An aggregate table as a query over ``innings``, typed like the SQLite table."""
+    ddl, select, _ = AGGREGATES[suffix]
+    cols = _columns(ddl)
+    names = ', '.join(n for n, _ in cols)
+    typed = ', '.join(f'CAST({n} AS BIGINT) AS {n}' if t == 'INTEGER' else n for n, t in cols)
+    return f'SELECT {typed} FROM ({select.format(innings=innings, where="")}) AS t({names})'
+
+
+class DuckDBBackend:
+    """The catalog on DuckDB, reading the Parquet store in place.
+
+    Every catalog table is a view: the summary and innings tables scan the
+    format's partition directly (or the legacy CSV when no store exists),
+    and the per-match aggregate tables are views over the innings views, so
+    new part files are picked up without any build step. DuckDB executes
+    the columnar scans vectorized across ``threads``.
+    """
+    name = 'duckdb'
+
+    def __init__(self, store_dir=storage.STORE_DIR, csv_dir='.', threads=None):
+        import duckdb
+
+        self.store_dir = store_dir
+        self.csv_dir = csv_dir
+        self.con = duckdb.connect(':memory:')
+        if threads:
+            self.con.execute(f'SET threads = {int(threads)}')
+        self._local = threading.local()
+        for table, (fmt, kind) in SOURCES.items():
+            if not self._exists(kind, fmt):
+                continue
+            self.con.execute(f'CREATE VIEW {table} AS {self._source(kind, fmt)}')
+            if kind == 'innings':
+                prefix = table.rsplit('_', 1)[0]
+                for suffix in AGGREGATES:
+                    self.con.execute(f'CREATE VIEW {prefix}_{suffix} AS {_aggregate(suffix, table)}')
+
+    def _exists(self, kind, fmt):
+        return storage.exists(kind, fmt, self.store_dir) or os.path.exists(storage.csv_path(kind, fmt, self.csv_dir))
+
+    def _source(self, kind, fmt, window=None):
+        if storage.exists(kind, fmt, self.store_dir):
+            if not window:
+                files = _literal(os.path.join(storage.partition_dir(kind, fmt, self.store_dir), '**', '*.parquet'))
+            else:
+                files = storage.prune(kind, fmt, window, self.store_dir)
+                if not files:
+                    return f'SELECT * FROM main.{_name(fmt, kind)} WHERE false'
+                files = f'[{", ".join(map(_literal, files))}]'
+            return f'SELECT * FROM read_parquet({files}, hive_partitioning = false)'
+        return f"SELECT * FROM read_csv_auto({_literal(storage.csv_path(kind, fmt, self.csv_dir))})"
+
+    def restrict(self, sql, window):
+        """Rewrite a catalog statement to see only the matches of ``window``.
+
+        Every catalog table it reads is shadowed by a CTE that scans only the
+        season partitions the window can match (storage.prune); a date range
+        also filters rows by the summary's start_date. Aggregates are
+        recomputed over the pruned innings.
+        """
+        ctes = []
+        for fmt, kinds in _formats(sql).items():
+            summary = _name(fmt, 'summary')
+            ctes.append((summary, f'SELECT * FROM ({self._source("summary", fmt, window)}) '
+                                  f'WHERE {window_condition(window)}'))
+            if kinds - {'summary'}:
+                innings = _name(fmt, 'innings')
+                body = self._source('innings', fmt, window)
+                if not storage.pruned_exactly('innings', fmt, window, self.store_dir):
+                    body = f'SELECT * FROM ({body}) WHERE match_id IN (SELECT match_id FROM {summary})'
+                ctes.append((innings, body))
+            for suffix in sorted(kinds - {'summary', 'innings'}):
+                ctes.append((_name(fmt, suffix), _aggregate(suffix, _name(fmt, 'innings'))))
+        return windowed(sql, ctes)
+
+    def _cursor(self):
+        # DuckDB connections are not thread-safe; each thread gets its own cursor
+        cursor = getattr(self._local, 'cursor', None)
+        if cursor is None:
+            cursor = self._local.cursor = self.con.cursor()
+        return cursor
+
+    def read_sql(self, sql, params=None, window=None):
+        if window:
+            sql = self.restrict(sql, window)
+        return self._cursor().execute(sql.rstrip().rstrip(';'), params).fetchdf()
+
+    def explain(self, sql):
+        rows = self._cursor().execute('EXPLAIN ' + sql.rstrip().rstrip(';')).fetchall()
+        return [line for _, plan in rows for line in plan.splitlines() if line.strip()]
+
+    def index_stats(self):
+        return {}
+
+    def tables(self):
+        """Lower-case names of the catalog views over an existing source."""
+        rows = self._cursor().execute('SELECT view_name FROM duckdb_views() WHERE NOT internal').fetchall()
+        return {name.lower() for name, in rows} & set(TABLES)
+
+    def version(self):
+        """Digest of the store partitions the views read."""
+        h = hashlib.sha256(f'duckdb:{SCHEMA_VERSION}'.encode())
+        for fmt, kind in SOURCES.values():
+            if storage.exists(kind, fmt, self.store_dir):
+                h.update(repr(storage.fingerprint(kind, fmt, self.store_dir)).encode())
+            elif self._exists(kind, fmt):
+                st = os.stat(storage.csv_path(kind, fmt, self.csv_dir))
+                h.update(f'{st.st_size}:{st.st_mtime_ns}'.encode())
+        return h.hexdigest()[:16]
+
+    def dispose(self):
+        self.con.close()
+
+
+def configured_backend():
+    return (os.environ.get('CRICSHEET_BACKEND') or DEFAULT_BACKEND).lower()
+
+
+def open_backend(name=None, db_path=DB_PATH, store_dir=storage.STORE_DIR, csv_dir='.'):
+    """Open a backend by name; defaults to $CRICSHEET_BACKEND, then sqlite."""
+    name = (name or configured_backend()).lower()
+    if name == 'sqlite':
+        return SQLiteBackend(db_path)
+    if name == 'duckdb':
+        return DuckDBBackend(store_dir, csv_dir)
+    raise ValueError(f'Unknown backend {name!r}; expected one of {", ".join(BACKENDS)}')
+
+
+def _normalize(df):
+    """Put a result in a backend-independent form: dates as ISO strings,
+    numbers as rounded floats, rows in sorted order."""
+    df = df.copy()
+    for col in df.columns:
+        s = df[col]
+        values = s.dropna()
+        if pd.api.types.is_datetime64_any_dtype(s) or (
+                pd.api.types.is_string_dtype(s) and len(values)
+                and values.astype(str).str.match(r'^\d{4}-\d{2}-\d{2}').all()):
+            df[col] = pd.to_datetime(s).dt.strftime('%Y-%m-%d')
+        elif pd.api.types.is_numeric_dtype(s) and not pd.api.types.is_bool_dtype(s):
+            df[col] = s.astype('float64').round(6)
+    df.columns = [c.lower() for c in df.columns]
+    return df.sort_values(list(df.columns), kind='stable').reset_index(drop=True)
+
+
+def parity(left, right, quest=None, window=None):
+    """Run every catalog question on two backends, optionally within a window.
+
+    Returns {(fmt, qid): reason} for the questions whose results differ.
+    Row order is not compared, since it is only defined up to ties.
+    """
+    from queries import QUEST, run_query
+
+    mismatches = {}
+    for fmt, questions in (quest or QUEST).items():
+        for qid in questions:
+            a = _normalize(run_query(left, fmt, qid, window=window))
+            b = _normalize(run_query(right, fmt, qid, window=window))
+            if list(a.columns) != list(b.columns):
+                mismatches[(fmt, qid)] = f'columns {list(a.columns)} != {list(b.columns)}'
+            elif len(a) != len(b):
+                mismatches[(fmt, qid)] = f'{len(a)} rows != {len(b)} rows'
+            else:
+                try:
+                    pd.testing.assert_frame_equal(a, b, check_dtype=False)
+                except AssertionError as e:
+                    mismatches[(fmt, qid)] = str(e).splitlines()[0]
+    return mismatches
@@ -0,0 +1,212 @@
+import argparse
+import datetime
+import json
+import os
+import platform
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+import ingest
+import storage
+from charts import CHARTS
+from dataset import load_dataset
+from backends import BACKENDS, open_backend
+from db_build import DB_PATH, build_database
+from metrics import row_count
+from queries import QUEST, run_query
+from report import run_report, select_tasks
+from synthetic import generate
+
+RESULTS = 'bench_results.json'
+APP = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'Cricsheet_analysis.py')
+
+# Run in a fresh interpreter so imports and cached resources start cold:
+# times the first script run and the first question a user picks after it
+STARTUP_SCRIPT = """
+import json, sys, time
+start = time.perf_counter()
+from streamlit.testing.v1 import AppTest
+at = AppTest.from_file(sys.argv[1], default_timeout=600)
+at.run()
+cold = time.perf_counter() - start
+start = time.perf_counter()
+at.selectbox(key=sys.argv[2]).select_index(0).run()
+first = time.perf_counter() - start
+print(json.dumps({'cold_start': cold, 'first_query': first, 'error': bool(at.exception)}))
+"""
+
+
+def timed(fn, repeat=1):
+    """Return (list of wall times in seconds, result of the last call)."""
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn()
+        times.append(time.perf_counter() - start)
+    return times, result
+
+
+def record(results, group, name, times, rows=None, **extra):
+    entry = {'group': group, 'name': name, 'runs': len(times),
+             'min_s': round(min(times), 6), 'median_s': round(statistics.median(times), 6),
+             'rows': rows}
+    entry.update(extra)
+    results.append(entry)
+    print(f"{group:8} {name:28} {entry['median_s']:10.4f}s" + (f'  rows={rows}' if rows is not None else ''))
+    return entry
+
+
+def bench_ingest(results, data_dir, work_dir, workers=None):
+    """Time the single-process JSON parse and the parallel ingest into the store."""
+    for fmt, archive in ingest.FORMATS.items():
+        zip_path = os.path.join(data_dir, archive)
+        if not os.path.exists(zip_path):
+            continue
+        names = ingest.json_members(zip_path)
+        times, (summary, innings) = timed(lambda: ingest.parse_members(zip_path, names))
+        record(results, 'parse', fmt, times, len(innings), matches=len(names))
+        times, _ = timed(lambda: ingest.ingest_format(fmt, zip_path, work_dir, workers, full=True))
+        record(results, 'ingest', fmt, times, len(innings), matches=len(names))
+
+
+def bench_build(results, work_dir):
+    db_path = os.path.join(work_dir, DB_PATH)
+    for suffix in ('', '-wal', '-shm'):
+        if os.path.exists(db_path + suffix):
+            os.remove(db_path + suffix)
+    times, rebuilt = timed(lambda: build_database(db_path, work_dir))
+    record(results, 'build', 'full', times, tables=len(rebuilt))
+    times, rebuilt = timed(lambda: build_database(db_path, work_dir))
+    record(results, 'build', 'noop', times, tables=len(rebuilt))
+    return db_path
+
+
+def bench_queries(results, db_path, work_dir, repeat, backends=('sqlite',)):
+    for name in backends:
+        backend = open_backend(name, db_path, os.path.join(work_dir, storage.STORE_DIR), work_dir)
+        for fmt, quest in QUEST.items():
+            for qid in quest:
+                times, df = timed(lambda: run_query(backend, fmt, qid), repeat)
+                record(results, 'query', f'{fmt} {qid}', times, row_count(df), backend=name)
+        backend.dispose()
+
+
+def bench_windows(results, db_path, work_dir, repeat, backends=('sqlite',), fmt='odi', qid='Q4'):
+    """Time a question and a format's dataset load over the last 1, 2, 5 and
+    all seasons; with season pruning both should grow with the window."""
+    store_dir = os.path.join(work_dir, storage.STORE_DIR)
+    seasons = storage.seasons(fmt, store_dir)
+    for n in (1, 2, 5, len(seasons)):
+        window = storage.Window(tuple(seasons[-n:]))
+        rows = storage.partition_stats(fmt, store_dir).set_index('season').loc[list(window.seasons), 'deliveries'].sum()
+        for name in backends:
+            backend = open_backend(name, db_path, store_dir, work_dir)
+            times, df = timed(lambda: run_query(backend, fmt.upper(), qid, window=window), repeat)
+            record(results, 'window', f'{fmt.upper()} {qid} {n} seasons', times, row_count(df), backend=name,
+                   deliveries=int(rows))
+            backend.dispose()
+        times, _ = timed(lambda: load_dataset(store_dir, work_dir, window=window).innings[fmt], repeat)
+        record(results, 'window', f'{fmt} innings {n} seasons', times, int(rows))
+
+
+def bench_charts(results, work_dir, repeat):
+    times, data = timed(lambda: load_dataset(os.path.join(work_dir, storage.STORE_DIR), work_dir, eager=True))
+    record(results, 'dataset', 'load', times, sum(len(df) for df in data.innings.values()),
+           bytes=data.memory_usage())
+    for chart, (compute, _) in CHARTS.items():
+        times, summary = timed(lambda: compute(data), repeat)
+        record(results, 'chart', chart, times, row_count(summary))
+
+
+def bench_report(results, db_path, work_dir, workers=None):
+    """Time the headless report of every question and chart on one process
+    and on the whole pool."""
+    store_dir = os.path.join(work_dir, storage.STORE_DIR)
+    for n in sorted({1, workers or os.cpu_count() or 1}):
+        summary = run_report(os.path.join(work_dir, f'report-{n}'), select_tasks(), 'sqlite', db_path, store_dir,
+                             workers=n)
+        record(results, 'report', f'{n} workers', [summary['wall_seconds']], summary['tasks'],
+               task_s=summary['task_seconds'], failed=summary['failed'])
+
+
+def bench_startup(results, work_dir, repeat, fmt='T20'):
+    """Time the app's cold start and its first query, each run in a new process."""
+    runs = []
+    for _ in range(repeat):
+        out = subprocess.run([sys.executable, '-c', STARTUP_SCRIPT, APP, f'quest_{fmt}'], cwd=work_dir,
+                             capture_output=True, text=True, check=True).stdout
+        runs.append(json.loads(out.strip().splitlines()[-1]))
+    record(results, 'startup', 'cold start', [r['cold_start'] for r in runs])
+    record(results, 'startup', f'first {fmt} query', [r['first_query'] for r in runs],
+           errors=sum(r['error'] for r in runs))
+
+
+def _git_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True,
+                              cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip() or None
+    except OSError:
+        return None
+
+
+def run(data_dir=None, scale=0.1, seed=0, repeat=3, workers=None, work_dir=None, output=RESULTS,
+        backends=('sqlite',)):
+    """Run every benchmark group and write the results as JSON to ``output``."""
+    work_dir = work_dir or tempfile.mkdtemp(prefix='cricsheet_bench_')
+    meta = {
+        'started': datetime.datetime.now(datetime.timezone.utc).isoformat(timespec='seconds'),
+        'commit': _git_commit(),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'cpus': os.cpu_count(),
+        'repeat': repeat,
+        'workers': workers,
+    }
+    if data_dir is None:
+        data_dir = os.path.join(work_dir, 'archives')
+        start = time.perf_counter()
+        meta['matches'] = generate(data_dir, scale, seed=seed)
+        meta.update(scale=scale, seed=seed, generate_s=round(time.perf_counter() - start, 3))
+    meta['data_dir'] = data_dir
+    results = []
+    bench_ingest(results, data_dir, work_dir, workers)
+    db_path = bench_build(results, work_dir)
+    bench_queries(results, db_path, work_dir, repeat, backends)
+    bench_windows(results, db_path, work_dir, repeat, backends)
+    bench_charts(results, work_dir, repeat)
+    bench_report(results, db_path, work_dir, workers)
+    bench_startup(results, work_dir, repeat)
+    with open(output, 'w', encoding='utf-8') as f:
+        json.dump({'meta': meta, 'results': results}, f, indent=1)
+    return work_dir
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Benchmark ingestion, the database build, '
+                                                 'the query catalog and the chart compute steps.')
+    parser.add_argument('--data-dir', default=None,
+                        help='existing directory of Cricsheet archives (default: generate synthetic ones)')
+    parser.add_argument('--scale', type=float, default=0.1,
+                        help='size of the generated archives relative to the real ones')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--repeat', type=int, default=3, help='runs per query and chart')
+    parser.add_argument('--workers', type=int, default=None)
+    parser.add_argument('--work-dir', default=None, help='where the store and database are built')
+    parser.add_argument('--keep', action='store_true', help='keep the work directory')
+    parser.add_argument('--output', default=RESULTS)
+    parser.add_argument('--backends', nargs='+', choices=BACKENDS, default=['sqlite'],
+                        help='query backends to time the catalog on')
+    args = parser.parse_args(argv)
+    work_dir = run(args.data_dir, args.scale, args.seed, args.repeat, args.workers,
+                   args.work_dir, args.output, args.backends)
+    print(f'Results written to {args.output}')
+    if not args.keep and args.work_dir is None:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+
+if __name__ == '__main__':
+    main()
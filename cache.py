@@ -0,0 +1,87 @@
+import threading
+from collections import OrderedDict
+
+
+def _nbytes(value):
+    if hasattr(value, 'memory_usage'):
+        return int(value.memory_usage(index=True, deep=True).sum())
+    return 0
+
+
+class ResultCache:
+    """Thread-safe LRU cache of query results shared by all sessions.
+
+    Keys are ``(version, fmt, qid, params)`` tuples, where ``version`` is
+    the dataset version the result was computed from. The cache is bounded
+    by the estimated size of the cached frames; least recently used
+    entries are evicted first. Concurrent misses on the same key compute
+    the result once. Cached frames are shared, so callers must not
+    modify them.
+    """
+
+    def __init__(self, max_bytes=256 * 1024 * 1024):
+        self.max_bytes = max_bytes
+        self._entries = OrderedDict()
+        self._pending = {}
+        self._lock = threading.Lock()
+        self.nbytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    def get(self, key, compute):
+        """Return the cached value for ``key``, computing it on a miss."""
+        while True:
+            with self._lock:
+                if key in self._entries:
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return self._entries[key][0]
+                event = self._pending.get(key)
+                if event is None:
+                    self.misses += 1
+                    event = self._pending[key] = threading.Event()
+                    break
+            event.wait()
+        try:
+            value = compute()
+            self._put(key, value)
+            return value
+        finally:
+            with self._lock:
+                del self._pending[key]
+            event.set()
+
+    def _put(self, key, value):
+        size = _nbytes(value)
+        with self._lock:
+            if size > self.max_bytes:
+                return
+            self._entries[key] = (value, size)
+            self.nbytes += size
+            while self.nbytes > self.max_bytes:
+                _, (_, evicted) = self._entries.popitem(last=False)
+                self.nbytes -= evicted
+                self.evictions += 1
+
+    def invalidate(self, keep_version=None):
+        """Drop every entry not computed from ``keep_version``."""
+        with self._lock:
+            for key in [k for k in self._entries if k[0] != keep_version]:
+                self.nbytes -= self._entries.pop(key)[1]
+                self.invalidations += 1
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'entries': len(self._entries),
+                'bytes': self.nbytes,
+                'max_bytes': self.max_bytes,
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': round(self.hits / lookups, 3) if lookups else None,
+                'evictions': self.evictions,
+                'invalidations': self.invalidations,
+            }
@@ -0,0 +1,315 @@
+import time
+
+import numpy as np
+import pandas as pd
+import seaborn as sns
+from matplotlib.colors import to_rgba
+from matplotlib.figure import Figure
+
+from executor import per_format
+from metrics import METRICS, row_count
+
+# Every chart is split into a compute step, which reduces the dataset to a
+# compact summary (its size does not grow with the archive), and a plot
+# step that only ever sees that summary.
+
+
+def wins_by_team(summary):
+    """Matches won per team, ignoring no-results."""
+    return summary.loc[summary['winner'] != 'No Result', 'winner'].value_counts()
+
+
+def most_wins(wins, n=10):
+    """Merge per-format win counts and keep the n most successful teams."""
+    match = pd.concat(list(wins.values())).groupby(level=0).sum()
+    match = match.sort_values(ascending=False).head(n)
+    return match.rename_axis('winner').reset_index(name='count')
+
+
+def fewest_wins(summary, n):
+    worst = summary[summary.winner != 'No Result'].groupby('winner').agg(wins=("winner", "count"))
+    worst.reset_index(inplace=True)
+    worst = worst.sort_values(by='wins').head(n)
+    return worst.reset_index(drop=True)
+
+
+def top_run_scorers(innings, n=10):
+    top = innings.groupby("batsman", observed=True)["runs_scored"].sum().reset_index()
+    top = top.sort_values("runs_scored", ascending=False).head(n)
+    top["batsman"] = top["batsman"].astype(str)
+    return top
+
+
+def top_wicket_takers(innings, n=10):
+    wickets = innings.loc[innings['wicket_type'] != 'Not Out', 'bowler']
+    top = wickets.value_counts().head(n)
+    top.index = top.index.astype(str)
+    return top
+
+
+def runs_distribution(innings):
+    """Deliveries per runs_scored value (runs are small non-negative integers)."""
+    counts = np.bincount(innings['runs_scored'].to_numpy())
+    runs = np.flatnonzero(counts)
+    return pd.DataFrame({'runs': runs, 'count': counts[runs]})
+
+
+def runs_per_over(innings):
+    """Mean runs per delivery for each over with a 95% normal-approximation CI.
+
+    Stands in for seaborn's bootstrapped lineplot interval, computed from
+    per-over counts, sums and sums of squares in one pass.
+    """
+    over = innings['over'].to_numpy()
+    runs = innings['runs_scored'].to_numpy(dtype=np.float64)
+    n = np.bincount(over)
+    total = np.bincount(over, weights=runs)
+    squares = np.bincount(over, weights=runs * runs)
+    overs = np.flatnonzero(n)
+    n, total, squares = n[overs], total[overs], squares[overs]
+    mean = total / n
+    var = np.where(n > 1, (squares - n * mean ** 2) / np.maximum(n - 1, 1), 0.0)
+    half = 1.96 * np.sqrt(np.maximum(var, 0.0) / n)
+    return pd.DataFrame({'over': overs, 'mean': mean, 'low': mean - half, 'high': mean + half})
+
+
+def ball_runs_points(innings):
+    """Distinct (ball_number, runs_scored) points with how many deliveries fall on each."""
+    points = innings.groupby(['ball_number', 'runs_scored'], observed=True).size()
+    return points.rename('count').reset_index()
+
+
+def wickets_per_over(innings):
+    wickets = (innings['wicket_type'] != 'Not Out').astype(int)
+    return pd.DataFrame({'total_runs': innings['runs_scored'].astype(int), 'total_wickets': wickets}
+                        ).groupby(innings['over']).sum().rename_axis('over').reset_index()
+
+
+def toss_wins(summary):
+    decided = summary[summary.winner != 'No Result']
+    return decided.groupby(['toss_decision', 'winner'], sort=False).size().rename('count').reset_index()
+
+
+def _histogram(ax, dist, color):
+    """Histogram with a KDE line, as sns.histplot(bins=20, kde=True) draws
+    for the raw values, computed from the value counts."""
+    runs = dist['runs'].to_numpy(dtype=np.float64)
+    counts = dist['count'].to_numpy(dtype=np.float64)
+    sns.histplot(x=runs, weights=counts, bins=20, color=color, ax=ax)
+    n = counts.sum()
+    if len(runs) < 2 or n < 2:
+        return
+    mean = np.average(runs, weights=counts)
+    std = np.sqrt(np.sum(counts * (runs - mean) ** 2) / (n - 1))
+    bw = std * n ** (-1 / 5)
+    grid = np.linspace(runs.min(), runs.max(), 200)
+    density = (counts * np.exp(-0.5 * ((grid[:, None] - runs) / bw) ** 2)).sum(axis=1) / (n * bw * np.sqrt(2 * np.pi))
+    binwidth = (runs.max() - runs.min()) / 20
+    ax.plot(grid, density * n * binwidth, color=color)
+
+
+def _line_ci(ax, summary, color, **kwargs):
+    ax.plot(summary['over'], summary['mean'], color=color, **kwargs)
+    ax.fill_between(summary['over'], summary['low'], summary['high'], color=color, alpha=0.2, linewidth=0)
+
+
+def compute_chart_1(data):
+    return most_wins(per_format(lambda fmt: wins_by_team(data.summary[fmt])))
+
+
+def plot_chart_1(match):
+    fig = Figure(figsize=(10, 6))
+    ax = fig.subplots()
+    sns.barplot(data=match, x='count', y='winner', hue='winner', palette='rocket', ax=ax)
+    ax.set_title("Top 10 most successful teams in all formats")
+    return fig
+
+
+def compute_chart_2(data):
+    return per_format(lambda fmt: runs_distribution(data.innings[fmt]))
+
+
+def plot_chart_2(dist):
+    fig = Figure(figsize=(12, 10))
+    for pos, fmt, color, name in (((2, 2, 1), 'test', 'blue', 'Test'),
+                                  ((2, 2, 2), 'odi', 'green', 'ODI'),
+                                  ((2, 1, 2), 't20', 'red', 'T20')):
+        ax = fig.add_subplot(*pos)
+        _histogram(ax, dist[fmt], color)
+        ax.set_title(f"Runs Distribution in {name} Matches")
+        ax.set_xlabel("Runs Scored")
+        ax.set_ylabel("Frequency")
+    fig.tight_layout()
+    return fig
+
+
+def compute_chart_3(data):
+    return per_format(lambda fmt: runs_per_over(data.innings[fmt]))
+
+
+def plot_chart_3(per_over):
+    fig = Figure(figsize=(12, 10))
+    for pos, fmt, color, name in (((2, 2, 1), 't20', 'blue', 'T20'),
+                                  ((2, 2, 2), 'odi', 'green', 'ODI'),
+                                  ((2, 1, 2), 'test', 'red', 'Test')):
+        ax = fig.add_subplot(*pos)
+        _line_ci(ax, per_over[fmt], color)
+        ax.set_title(f"Runs Scored per Over in {name} Matches")
+        ax.set_xlabel("Over Number")
+        ax.set_ylabel("Runs Scored")
+    fig.tight_layout()
+    return fig
+
+
+def compute_chart_4(data):
+    return toss_wins(data.summary['test'])
+
+
+def plot_chart_4(counts):
+    fig = Figure(figsize=(12, 6))
+    ax = fig.subplots()
+    sns.barplot(data=counts, x='toss_decision', y='count', hue='winner', palette="coolwarm", ax=ax)
+    ax.set_title("Win % Based on Toss Decision in Test Matches")
+    ax.set_xlabel("Toss Decision")
+    ax.set_ylabel("Total Wins")
+    ax.legend(title="Winning Team")
+    return fig
+
+
+def compute_chart_5(data):
+    return ball_runs_points(data.innings['odi'])
+
+
+def plot_chart_5(points):
+    # One marker per distinct point; its opacity is that of ``count``
+    # stacked markers at alpha 0.5, so the plot looks like the full scatter.
+    fig = Figure(figsize=(10, 6))
+    ax = fig.subplots()
+    colors = np.tile(to_rgba("green"), (len(points), 1))
+    colors[:, 3] = 1 - 0.5 ** points['count'].to_numpy()
+    ax.scatter(points['ball_number'], points['runs_scored'], c=colors, edgecolors='none')
+    ax.set_title("Balls Taken vs. Runs Scored in ODI Matches")
+    ax.set_xlabel("Balls Faced")
+    ax.set_ylabel("Runs Scored")
+    return fig
+
+
+def compute_chart_6(data):
+    return per_format(lambda fmt: top_run_scorers(data.innings[fmt]))
+
+
+def plot_chart_6(top):
+    fig = Figure(figsize=(12, 10))
+    for pos, fmt, palette, name in (((2, 2, 1), 'odi', 'viridis', 'ODI'),
+                                    ((2, 2, 2), 't20', 'coolwarm', 'T20'),
+                                    ((2, 1, 2), 'test', 'Set2', 'Test')):
+        ax = fig.add_subplot(*pos)
+        scorers = top[fmt]
+        sns.barplot(x=scorers["runs_scored"], y=scorers["batsman"], hue=scorers["batsman"], palette=palette, ax=ax)
+        ax.set_title(f"Top 10 Run Scorers in {name} Matches")
+        ax.set_xlabel("Total Runs")
+        ax.set_ylabel("Batsman")
+    fig.tight_layout()
+    return fig
+
+
+def compute_chart_7(data):
+    return runs_per_over(data.innings['t20'])
+
+
+def plot_chart_7(per_over):
+    fig = Figure(figsize=(12, 6))
+    ax = fig.subplots()
+    over = per_over['over']
+    _line_ci(ax, per_over[over <= 6], "blue", label="Powerplay (0-6)", marker="o")
+    _line_ci(ax, per_over[(over >= 6) & (over <= 16)], "green", label="Middle Overs (6-15)", marker="o")
+    _line_ci(ax, per_over[over >= 16], "red", label="Death Overs (16-20)", marker="o")
+    ax.set_title("Strike Rate Across Different Phases in T20s")
+    ax.set_xlabel("Over Number")
+    ax.set_ylabel("Runs Scored")
+    ax.legend()
+    return fig
+
+
+def compute_chart_8(data):
+    return per_format(lambda fmt: wickets_per_over(data.innings[fmt]), formats=('t20', 'test'))
+
+
+def plot_chart_8(per_over):
+    fig = Figure(figsize=(10, 8))
+    ax = fig.subplots(2, 2)
+    for axis, fmt, palette, name in ((ax[0, 0], 't20', 'viridis', 'T20'),
+                                     (ax[0, 1], 'test', 'magma', 'Test')):
+        sns.scatterplot(x=per_over[fmt]["total_runs"], y=per_over[fmt]["total_wickets"],
+                        hue=per_over[fmt]["over"], palette=palette, ax=axis)
+        axis.set_title(f"Runs vs. Wickets Lost per Over in {name}")
+        axis.set_xlabel("Total Runs Scored")
+        axis.set_ylabel("Total Wickets Lost")
+        axis.legend(title="Over Number")
+    fig.delaxes(ax[1, 0])
+    fig.delaxes(ax[1, 1])
+    fig.tight_layout()
+    return fig
+
+
+def compute_chart_9(data):
+    return per_format(lambda fmt: top_wicket_takers(data.innings[fmt]))
+
+
+def plot_chart_9(top):
+    fig = Figure(figsize=(12, 10))
+    for pos, fmt, palette, name in (((2, 2, 1), 'test', 'terrain_r', 'Test'),
+                                    ((2, 2, 2), 'odi', 'deep', 'ODI'),
+                                    ((2, 1, 2), 't20', 'muted', 'T20')):
+        ax = fig.add_subplot(*pos)
+        bowlers = top[fmt]
+        sns.barplot(x=bowlers.values, y=bowlers.index, hue=bowlers.index, palette=palette, ax=ax)
+        ax.set_xlabel('Total wickets')
+        ax.set_ylabel('Bowler')
+        ax.set_title(f'Top 10 Wicket Takers in {name}')
+    fig.tight_layout()
+    return fig
+
+
+def compute_chart_10(data):
+    return per_format(lambda fmt: fewest_wins(data.summary[fmt], 10 if fmt == 't20' else 5))
+
+
+def plot_chart_10(worst):
+    fig = Figure(figsize=(12, 10))
+    for pos, fmt, color, title in (((2, 2, 1), 'test', 'green', "Top 5 Poorly Performing Teams - Test"),
+                                   ((2, 2, 2), 'odi', 'red', "Top 5 Poorly Performing Teams - ODI"),
+                                   ((2, 1, 2), 't20', 'blue', "Top 10 Poorly Performing Teams - T20")):
+        ax = fig.add_subplot(*pos)
+        ax.bar(worst[fmt]['winner'], worst[fmt]['wins'], color=color)
+        ax.set_title(title)
+        ax.set_xlabel("Teams")
+        ax.set_ylabel("Matches Won")
+        ax.tick_params(axis='x', rotation=45)
+    fig.tight_layout()
+    return fig
+
+
+# chart name -> (compute step, plot step)
+CHARTS = {
+    "Chart 1": (compute_chart_1, plot_chart_1),
+    "Chart 2": (compute_chart_2, plot_chart_2),
+    "Chart 3": (compute_chart_3, plot_chart_3),
+    "Chart 4": (compute_chart_4, plot_chart_4),
+    "Chart 5": (compute_chart_5, plot_chart_5),
+    "Chart 6": (compute_chart_6, plot_chart_6),
+    "Chart 7": (compute_chart_7, plot_chart_7),
+    "Chart 8": (compute_chart_8, plot_chart_8),
+    "Chart 9": (compute_chart_9, plot_chart_9),
+    "Chart 10": (compute_chart_10, plot_chart_10),
+}
+
+
+def render(chart, data):
+    compute, plot = CHARTS[chart]
+    with METRICS.timer('chart', chart) as event:
+        start = time.perf_counter()
+        summary = compute(data)
+        event['compute_s'] = round(time.perf_counter() - start, 6)
+        event['rows'] = row_count(summary)
+        return plot(summary)
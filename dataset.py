@@ -0,0 +1,133 @@
+import threading
+from collections.abc import Mapping
+from dataclasses import dataclass
+
+import pandas as pd
+
+import storage
+from executor import FORMATS, per_format
+from innings_state import InningsState
+from metrics import METRICS
+
+# Columns dictionary-encoded against one category set per format
+PLAYER_COLUMNS = ('batsman', 'bowler', 'non_striker', 'player_out')
+TEAM_COLUMNS = ('inning_team',)
+CATEGORY_COLUMNS = ('wicket_type',)
+INTEGER_COLUMNS = ('over', 'runs_scored', 'extras', 'total_runs')
+
+
+class LazyFrames(Mapping):
+    """Read-only {fmt: frame} that loads each format the first time it is read.
+
+    Loads are cached and guarded by a per-format lock, so concurrent readers
+    of one format share a single load while different formats load in
+    parallel.
+    """
+
+    def __init__(self, load, formats=FORMATS):
+        self._load = load
+        self._frames = {}
+        self._locks = {fmt: threading.Lock() for fmt in formats}
+
+    def __getitem__(self, fmt):
+        frame = self._frames.get(fmt)
+        if frame is None:
+            with self._locks[fmt]:
+                frame = self._frames.get(fmt)
+                if frame is None:
+                    frame = self._frames[fmt] = self._load(fmt)
+        return frame
+
+    def __iter__(self):
+        return iter(self._locks)
+
+    def __len__(self):
+        return len(self._locks)
+
+    def loaded(self):
+        """Return {fmt: frame} for the formats loaded so far."""
+        return dict(self._frames)
+
+
+@dataclass(frozen=True)
+class Dataset:
+    """Process-wide, read-only handles on the summary and innings frames.
+
+    Nothing is read until a view asks for a format: ``summary[fmt]`` and
+    ``innings[fmt]`` load and cache that one frame. Player and team names in
+    an innings frame are categoricals sharing one category set per format.
+    Callers must treat the frames as read-only; derive new columns on a copy
+    or a local Series. A dataset opened with a ``window`` only reads and
+    holds the matches of those seasons or dates. ``states[fmt]`` is the
+    format's InningsState, built from its innings frame on first use.
+    """
+    summary: LazyFrames
+    innings: LazyFrames
+    window: storage.Window = None
+    states: LazyFrames = None
+
+    def memory_usage(self):
+        frames = list(self.summary.loaded().values()) + list(self.innings.loaded().values())
+        return int(sum(df.memory_usage(deep=True).sum() for df in frames))
+
+
+def _categories(frames, columns):
+    values = pd.concat([pd.Series(df[c].unique()) for df in frames for c in columns],
+                       ignore_index=True)
+    return pd.CategoricalDtype(pd.Index(values.dropna().unique()).sort_values())
+
+
+def encode_innings(df):
+    """Return a compact copy of an innings frame (categorical names, small ints)."""
+    players = _categories([df], PLAYER_COLUMNS)
+    teams = _categories([df], TEAM_COLUMNS)
+    df = df.copy()
+    for col in PLAYER_COLUMNS:
+        df[col] = df[col].astype(players)
+    for col in TEAM_COLUMNS:
+        df[col] = df[col].astype(teams)
+    for col in CATEGORY_COLUMNS:
+        df[col] = df[col].astype('category')
+    for col in INTEGER_COLUMNS:
+        df[col] = pd.to_numeric(df[col], downcast='integer')
+    df['ball_number'] = df['ball_number'].astype('float32')
+    return df
+
+
+def _loader(kind, store_dir, csv_dir, window):
+    def load(fmt):
+        with METRICS.timer('load', f'{kind} {fmt}', window=window.key() if window else None) as event:
+            df = storage.load(kind, fmt, store_dir=store_dir, csv_dir=csv_dir, window=window)
+            if kind == 'innings':
+                df = encode_innings(df)
+            event['rows'] = len(df)
+            event['bytes'] = int(df.memory_usage(deep=True).sum())
+        return df
+    return load
+
+
+def _states(innings, window):
+    def build(fmt):
+        with METRICS.timer('load', f'state {fmt}', window=window.key() if window else None) as event:
+            state = InningsState(innings[fmt])
+            event['innings'] = len(state.match_id)
+        return state
+    return LazyFrames(build, tuple(innings))
+
+
+def load_dataset(store_dir=storage.STORE_DIR, csv_dir='.', eager=False, window=None):
+    """Return a Dataset whose frames load on first use (all at once if ``eager``),
+    holding only the matches of ``window`` if one is given."""
+    innings = LazyFrames(_loader('innings', store_dir, csv_dir, window))
+    data = Dataset(LazyFrames(_loader('summary', store_dir, csv_dir, window)), innings, window or None,
+                   _states(innings, window))
+    if eager:
+        per_format(lambda fmt: (data.summary[fmt], data.innings[fmt]))
+    return data
+
+
+def from_frames(summary, innings, window=None):
+    """Wrap {fmt: frame} dicts read elsewhere (e.g. from a backend) as a Dataset."""
+    innings = LazyFrames(innings.__getitem__, tuple(innings))
+    return Dataset(LazyFrames(summary.__getitem__, tuple(summary)), innings, window or None,
+                   _states(innings, window))
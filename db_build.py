@@ -0,0 +1,492 @@
+import argparse
+import hashlib
+import os
+import sqlite3
+import time
+
+import pandas as pd
+from sqlalchemy import create_engine, event, text
+from sqlalchemy.pool import QueuePool
+
+import storage
+from metrics import METRICS
+
+DB_PATH = 'cricket_data.db'
+
+# Bump whenever the way tables are derived from the sources changes,
+# so that every table gets rebuilt on the next run.
+SCHEMA_VERSION = 4
+
+META_TABLE = '_build_meta'
+PARTS_TABLE = '_build_parts'
+
+# table name -> (format, kind)
+SOURCES = {
+    'Test_Summary': ('test', 'summary'),
+    'Test_Innings': ('test', 'innings'),
+    'ODI_Summary': ('odi', 'summary'),
+    'ODI_Innings': ('odi', 'innings'),
+    'T20_Summary': ('t20', 'summary'),
+    'T20_Innings': ('t20', 'innings'),
+}
+
+DDL = {
+    'summary': '''CREATE TABLE {table} (
+                    match_id INTEGER PRIMARY KEY,
+                    match_type TEXT,
+                    season TEXT,
+                    venue TEXT,
+                    city TEXT,
+                    start_date TIMESTAMP,
+                    end_date TIMESTAMP,
+                    duration_days INTEGER,
+                    team_1 TEXT,
+                    team_2 TEXT,
+                    toss_winner TEXT,
+                    toss_decision TEXT,
+                    winner TEXT,
+                    player_of_match TEXT)''',
+    'innings': '''CREATE TABLE {table} (
+                    match_id INTEGER NOT NULL,
+                    inning_team TEXT NOT NULL,
+                    over INTEGER NOT NULL,
+                    ball_number REAL NOT NULL,
+                    batsman TEXT NOT NULL,
+                    bowler TEXT NOT NULL,
+                    non_striker TEXT NOT NULL,
+                    runs_scored INTEGER NOT NULL,
+                    extras INTEGER NOT NULL,
+                    total_runs INTEGER NOT NULL,
+                    wicket_type TEXT NOT NULL,
+                    player_out TEXT NOT NULL)''',
+}
+
+# index suffix -> indexed columns. The trailing columns make the batsman and
+# bowler indexes covering for the leaderboard queries.
+INDEXES = {
+    'summary': {
+        'season': 'season',
+        'start_date': 'start_date',
+    },
+    'innings': {
+        'match': 'match_id',
+        'match_team': 'match_id, inning_team',
+        'batsman': 'batsman, runs_scored',
+        'bowler': 'bowler, wicket_type',
+    },
+}
+
+# Derived per-match tables maintained next to each innings table, e.g.
+# Test_Innings -> Test_Batting, Test_Bowling, Test_Team_Totals. The ball data
+# has no innings number, so "per innings" means per (match, batting team).
+# name suffix -> (column definitions, aggregate over the innings table, indexes)
+AGGREGATES = {
+    'Batting': ('''match_id INTEGER NOT NULL,
+                   inning_team TEXT NOT NULL,
+                   batsman TEXT NOT NULL,
+                   runs INTEGER NOT NULL,
+                   balls INTEGER NOT NULL,
+                   PRIMARY KEY (match_id, inning_team, batsman)''',
+                '''SELECT match_id, inning_team, batsman,
+                          SUM(runs_scored), COUNT(*)
+                   FROM {innings} {where}
+                   GROUP BY match_id, inning_team, batsman''',
+                {'batsman': 'batsman, runs, balls'}),
+    # inning_team is the batting side the figures were taken against
+    'Bowling': ('''match_id INTEGER NOT NULL,
+                   inning_team TEXT NOT NULL,
+                   bowler TEXT NOT NULL,
+                   balls INTEGER NOT NULL,
+                   runs_conceded INTEGER NOT NULL,
+                   wickets INTEGER NOT NULL,
+                   dot_balls INTEGER NOT NULL,
+                   PRIMARY KEY (match_id, inning_team, bowler)''',
+                '''SELECT match_id, inning_team, bowler,
+                          COUNT(*), SUM(total_runs),
+                          SUM(wicket_type != 'Not Out'),
+                          SUM(runs_scored = 0 AND extras = 0)
+                   FROM {innings} {where}
+                   GROUP BY match_id, inning_team, bowler''',
+                {'bowler': 'bowler, wickets'}),
+    # powerplay and death overs use the T20 definitions (overs 0-5 and 15+)
+    'Team_Totals': ('''match_id INTEGER NOT NULL,
+                       inning_team TEXT NOT NULL,
+                       runs INTEGER NOT NULL,
+                       total_runs INTEGER NOT NULL,
+                       balls INTEGER NOT NULL,
+                       wickets INTEGER NOT NULL,
+                       powerplay_runs INTEGER NOT NULL,
+                       death_runs INTEGER NOT NULL,
+                       PRIMARY KEY (match_id, inning_team)''',
+                    '''SELECT match_id, inning_team,
+                              SUM(runs_scored), SUM(total_runs), COUNT(*),
+                              SUM(wicket_type != 'Not Out'),
+                              SUM(CASE WHEN over < 6 THEN runs_scored ELSE 0 END),
+                              SUM(CASE WHEN over >= 15 THEN runs_scored ELSE 0 END)
+                       FROM {innings} {where}
+                       GROUP BY match_id, inning_team''',
+                    {'runs': 'runs'}),
+}
+
+# Memory a build may use for the rows it holds while loading a table; set
+# CRICSHEET_MEMORY_BUDGET (bytes) or pass memory_budget to build_database
+MEMORY_BUDGET = int(os.environ.get('CRICSHEET_MEMORY_BUDGET', 256 * 1024 * 1024))
+# Peak bytes per loaded row relative to its DataFrame size: the frame plus
+# the row tuples handed to executemany
+INSERT_OVERHEAD = 3
+MIN_CHUNK_ROWS = 1000
+
+# Read-side settings for the analytics connections
+READ_PRAGMAS = (
+    'PRAGMA query_only = 1',
+    'PRAGMA mmap_size = 1073741824',
+    'PRAGMA cache_size = -262144',
+    'PRAGMA temp_store = MEMORY',
+)
+
+
+def file_hash(path, block_size=1 << 20):
+    h = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(block_size), b''):
+            h.update(block)
+    return h.hexdigest()
+
+
+def fingerprint(path, previous=None):
+    """Return (size, mtime_ns, sha256) for a source file.
+
+    The content hash is only recomputed when size or mtime differ from
+    the previous fingerprint, so an unchanged tree costs one stat per file.
+    """
+    st = os.stat(path)
+    if previous is not None and previous[:2] == (st.st_size, st.st_mtime_ns):
+        return previous
+    return (st.st_size, st.st_mtime_ns, file_hash(path))
+
+
+def source_of(table, data_dir='.'):
+    """Return the path a table is built from: the Parquet partition when the
+    store has been built, the legacy CSV otherwise."""
+    fmt, kind = SOURCES[table]
+    store_dir = os.path.join(data_dir, storage.STORE_DIR)
+    if storage.exists(kind, fmt, store_dir):
+        return storage.partition_dir(kind, fmt, store_dir)
+    return storage.csv_path(kind, fmt, data_dir)
+
+
+def missing_sources(data_dir='.'):
+    """Tables with neither a store partition nor a CSV to build from, e.g. a
+    format that was never ingested. They are left out of the build."""
+    return [table for table in SOURCES if not os.path.exists(source_of(table, data_dir))]
+
+
+def source_fingerprint(table, data_dir='.', previous=None):
+    fmt, kind = SOURCES[table]
+    path = source_of(table, data_dir)
+    if os.path.isdir(path):
+        return storage.fingerprint(kind, fmt, os.path.join(data_dir, storage.STORE_DIR))
+    return fingerprint(path, previous)
+
+
+def aggregate_tables(table):
+    """Return the derived table names maintained for an innings table."""
+    if SOURCES[table][1] != 'innings':
+        return []
+    prefix = table.rsplit('_', 1)[0]
+    return [f'{prefix}_{suffix}' for suffix in AGGREGATES]
+
+
+def _ensure_meta(conn):
+    conn.execute(text(f'''CREATE TABLE IF NOT EXISTS {META_TABLE} (
+                          table_name TEXT PRIMARY KEY,
+                          source TEXT NOT NULL,
+                          size INTEGER NOT NULL,
+                          mtime_ns INTEGER NOT NULL,
+                          sha256 TEXT NOT NULL,
+                          schema_version INTEGER NOT NULL,
+                          built_at REAL NOT NULL)'''))
+    conn.execute(text(f'''CREATE TABLE IF NOT EXISTS {PARTS_TABLE} (
+                          table_name TEXT NOT NULL,
+                          part TEXT NOT NULL,
+                          match_id INTEGER NOT NULL)'''))
+
+
+def read_meta(engine):
+    with engine.begin() as conn:
+        _ensure_meta(conn)
+        rows = conn.execute(text(f'''SELECT table_name, source, size, mtime_ns, sha256, schema_version
+                                     FROM {META_TABLE}''')).fetchall()
+    return {r[0]: (r[1], (r[2], r[3], r[4]), r[5]) for r in rows}
+
+
+def scan_sources(db_path=DB_PATH, data_dir='.'):
+    """Compare the source files against the stored fingerprints.
+
+    Returns ({table: (source, fingerprint, incremental)} needing a rebuild,
+             {table: (source, fingerprint)} that were only touched, i.e. same content).
+    Tables without a source are skipped.
+    """
+    if not os.path.exists(db_path):
+        meta = {}
+    else:
+        engine = create_engine(f'sqlite:///{db_path}')
+        meta = read_meta(engine)
+        engine.dispose()
+    stale, touched = {}, {}
+    missing = missing_sources(data_dir)
+    for table in SOURCES:
+        if table in missing:
+            continue
+        source, stored, version = meta.get(table, (None, None, None))
+        current = source_of(table, data_dir)
+        # Sources are recorded relative to the data directory, so a copy of
+        # the database next to a copy of the store stays up to date
+        relative = os.path.relpath(current, data_dir)
+        if source is None or os.path.normpath(source) != relative:
+            stored = None
+        fp = source_fingerprint(table, data_dir, stored)
+        if version != SCHEMA_VERSION or stored is None or fp[2] != stored[2]:
+            # Store partitions can be applied part by part on top of the
+            # previous load; anything else is reloaded from scratch.
+            incremental = stored is not None and version == SCHEMA_VERSION and os.path.isdir(current)
+            stale[table] = (relative, fp, incremental)
+        elif fp != stored:
+            touched[table] = (relative, fp)
+    return stale, touched
+
+
+def stale_tables(db_path=DB_PATH, data_dir='.'):
+    """Return {table: (source, fingerprint, incremental)} for the tables that need rebuilding."""
+    return scan_sources(db_path, data_dir)[0]
+
+
+def _write_meta(conn, table, source, fp):
+    size, mtime_ns, sha = fp
+    conn.execute(text(f'''INSERT OR REPLACE INTO {META_TABLE}
+                          VALUES (:t, :s, :size, :mtime, :sha, :v, :at)'''),
+                 dict(t=table, s=source, size=size, mtime=mtime_ns,
+                      sha=sha, v=SCHEMA_VERSION, at=time.time()))
+
+
+def create_table(conn, table):
+    kind = SOURCES[table][1]
+    conn.execute(text(f'DROP TABLE IF EXISTS {table}'))
+    conn.execute(text(DDL[kind].format(table=table)))
+    conn.execute(text(f'DELETE FROM {PARTS_TABLE} WHERE table_name = :t'), dict(t=table))
+
+
+def create_indexes(conn, table):
+    """Index a freshly loaded table and refresh its planner statistics."""
+    kind = SOURCES[table][1]
+    for suffix, columns in INDEXES[kind].items():
+        conn.execute(text(f'CREATE INDEX ix_{table.lower()}_{suffix} ON {table} ({columns})'))
+    conn.execute(text(f'ANALYZE {table}'))
+
+
+def _record_part(conn, table, part, match_ids):
+    conn.execute(text(f'INSERT INTO {PARTS_TABLE} VALUES (:t, :p, :m)'),
+                 [dict(t=table, p=os.path.basename(part), m=int(m)) for m in match_ids])
+
+
+def _set_affected(conn, match_ids):
+    conn.execute(text('CREATE TEMP TABLE IF NOT EXISTS _affected (match_id INTEGER PRIMARY KEY)'))
+    conn.execute(text('DELETE FROM _affected'))
+    if match_ids:
+        conn.execute(text('INSERT OR IGNORE INTO _affected VALUES (:m)'),
+                     [dict(m=int(m)) for m in match_ids])
+
+
+def chunk_rows(table, data_dir='.', memory_budget=None):
+    """Rows per chunk that keep a table's load within the memory budget."""
+    fmt, kind = SOURCES[table]
+    sample = storage.sample(kind, fmt, MIN_CHUNK_ROWS, os.path.join(data_dir, storage.STORE_DIR), data_dir)
+    row_bytes = sample.memory_usage(index=False, deep=True).sum() / max(len(sample), 1)
+    return max(MIN_CHUNK_ROWS, int((memory_budget or MEMORY_BUDGET) / (row_bytes * INSERT_OVERHEAD)))
+
+
+def bulk_insert(conn, table, df):
+    """Insert a frame with a single executemany on the open transaction.
+
+    Values are converted the way DataFrame.to_sql stores them, so chunked
+    and whole-frame loads produce the same rows.
+    """
+    columns = []
+    for col in df.columns:
+        s = df[col]
+        if pd.api.types.is_datetime64_any_dtype(s):
+            s = s.dt.strftime('%Y-%m-%d %H:%M:%S.%f')
+        columns.append(s.astype(object).where(s.notna(), None).tolist())
+    names = ', '.join(f'"{c}"' for c in df.columns)
+    marks = ', '.join('?' * len(columns))
+    conn.exec_driver_sql(f'INSERT INTO {table} ({names}) VALUES ({marks})', list(zip(*columns)))
+
+
+def _load_parts(conn, table, paths, rows):
+    """Stream part files into a table in chunks; returns the loaded match ids."""
+    loaded = set()
+    for path in paths:
+        ids = set()
+        for df in storage.iter_part(path, rows):
+            bulk_insert(conn, table, df)
+            ids.update(int(m) for m in df['match_id'].unique())
+        _record_part(conn, table, path, ids)
+        loaded |= ids
+    return loaded
+
+
+def full_load(conn, table, data_dir='.', memory_budget=None):
+    """Recreate a table from its source in chunks sized to the memory budget."""
+    fmt, kind = SOURCES[table]
+    create_table(conn, table)
+    rows = chunk_rows(table, data_dir, memory_budget)
+    source = source_of(table, data_dir)
+    if os.path.isdir(source):
+        _load_parts(conn, table, storage.parts(kind, fmt, os.path.join(data_dir, storage.STORE_DIR)), rows)
+    else:
+        for df in storage.iter_csv(kind, fmt, rows, data_dir):
+            bulk_insert(conn, table, df)
+    create_indexes(conn, table)
+
+
+def incremental_load(conn, table, data_dir='.', memory_budget=None):
+    """Apply the store parts added or removed since the last load.
+
+    Store parts are immutable, so a removed part means its matches were
+    rewritten: all of its matches are deleted and the added parts (which
+    carry the rewritten and the new matches) are inserted. Returns the
+    match ids whose rows changed.
+    """
+    fmt, kind = SOURCES[table]
+    current = {os.path.basename(p): p
+               for p in storage.parts(kind, fmt, os.path.join(data_dir, storage.STORE_DIR))}
+    loaded = {}
+    for part, match_id in conn.execute(text(f'''SELECT part, match_id FROM {PARTS_TABLE}
+                                                WHERE table_name = :t'''), dict(t=table)):
+        loaded.setdefault(part, set()).add(match_id)
+
+    removed = set(loaded) - set(current)
+    affected = set().union(*(loaded[p] for p in removed))
+    _set_affected(conn, affected)
+    conn.execute(text(f'DELETE FROM {table} WHERE match_id IN (SELECT match_id FROM _affected)'))
+    for part in removed:
+        conn.execute(text(f'DELETE FROM {PARTS_TABLE} WHERE table_name = :t AND part = :p'),
+                     dict(t=table, p=part))
+    added = [current[name] for name in sorted(set(current) - set(loaded))]
+    if added:
+        affected |= _load_parts(conn, table, added, chunk_rows(table, data_dir, memory_budget))
+    return affected
+
+
+def refresh_aggregates(conn, table, affected=None):
+    """Rebuild the derived tables of an innings table.
+
+    With ``affected`` match ids only those matches are re-aggregated;
+    otherwise the derived tables are recreated from the whole table.
+    """
+    prefix = table.rsplit('_', 1)[0]
+    if affected is not None:
+        _set_affected(conn, affected)
+    for suffix, (columns, select, indexes) in AGGREGATES.items():
+        derived = f'{prefix}_{suffix}'
+        if affected is None:
+            conn.execute(text(f'DROP TABLE IF EXISTS {derived}'))
+            conn.execute(text(f'CREATE TABLE {derived} ({columns})'))
+            where = ''
+        else:
+            conn.execute(text(f'DELETE FROM {derived} WHERE match_id IN (SELECT match_id FROM _affected)'))
+            where = 'WHERE match_id IN (SELECT match_id FROM _affected)'
+        conn.execute(text(f'INSERT INTO {derived} ' + select.format(innings=table, where=where)))
+        if affected is None:
+            for name, cols in indexes.items():
+                conn.execute(text(f'CREATE INDEX ix_{derived.lower()}_{name} ON {derived} ({cols})'))
+        conn.execute(text(f'ANALYZE {derived}'))
+
+
+def _write_engine(db_path):
+    engine = create_engine(f'sqlite:///{db_path}')
+    with engine.connect() as conn:
+        conn.exec_driver_sql('PRAGMA journal_mode = WAL')
+    return engine
+
+
+def build_database(db_path=DB_PATH, data_dir='.', memory_budget=None):
+    """Rebuild only the tables whose source changed since the last build.
+
+    Each table is loaded in one transaction from chunks sized so the rows
+    in flight stay within ``memory_budget`` bytes (MEMORY_BUDGET by
+    default), whatever the size of the archive. Returns the list of
+    rebuilt table names (empty when nothing changed).
+    """
+    with METRICS.timer('build', 'database') as event:
+        stale, touched = scan_sources(db_path, data_dir)
+        event['tables'] = len(stale)
+        event['missing'] = missing_sources(data_dir)
+        if not stale and not touched:
+            return []
+        engine = _write_engine(db_path)
+        with engine.begin() as conn:
+            _ensure_meta(conn)
+            for table, (source, fp) in touched.items():
+                _write_meta(conn, table, source, fp)
+        for table, (source, fp, incremental) in stale.items():
+            with METRICS.timer('build', table, mode='incremental' if incremental else 'full') as step, \
+                    engine.begin() as conn:
+                if incremental:
+                    affected = incremental_load(conn, table, data_dir, memory_budget)
+                    conn.execute(text(f'ANALYZE {table}'))
+                    step['matches'] = len(affected)
+                else:
+                    full_load(conn, table, data_dir, memory_budget)
+                    affected = None
+                if SOURCES[table][1] == 'innings':
+                    refresh_aggregates(conn, table, affected)
+                _write_meta(conn, table, source, fp)
+                step['rows'] = conn.execute(text(f'SELECT COUNT(*) FROM {table}')).scalar()
+        engine.dispose()
+        return list(stale)
+
+
+def data_version(engine):
+    """Return a short digest identifying the loaded content of every table."""
+    with engine.connect() as conn:
+        rows = conn.execute(text(f'''SELECT table_name, sha256, schema_version
+                                     FROM {META_TABLE} ORDER BY table_name''')).fetchall()
+    return hashlib.sha256(repr([tuple(r) for r in rows]).encode()).hexdigest()[:16]
+
+
+def open_readonly(db_path=DB_PATH, pool_size=8):
+    """Return a pooled, read-only engine tuned for analytical queries.
+
+    Connections are opened with ``mode=ro`` and shared across Streamlit's
+    script threads; each new connection gets READ_PRAGMAS applied once.
+    """
+    uri = f'file:{os.path.abspath(db_path)}?mode=ro'
+    engine = create_engine('sqlite://', poolclass=QueuePool, pool_size=pool_size, max_overflow=pool_size,
+                           creator=lambda: sqlite3.connect(uri, uri=True, check_same_thread=False))
+
+    @event.listens_for(engine, 'connect')
+    def _configure(dbapi_conn, _):
+        for pragma in READ_PRAGMAS:
+            dbapi_conn.execute(pragma)
+
+    return engine
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Rebuild the tables whose source changed.')
+    parser.add_argument('--db', default=DB_PATH)
+    parser.add_argument('--data-dir', default='.')
+    parser.add_argument('--memory-budget', type=int, default=None, metavar='MB',
+                        help=f'memory for rows in flight (default {MEMORY_BUDGET >> 20} MB)')
+    args = parser.parse_args(argv)
+    budget = args.memory_budget << 20 if args.memory_budget else None
+    rebuilt = build_database(args.db, args.data_dir, budget)
+    missing = missing_sources(args.data_dir)
+    if missing:
+        print('No source for: ' + ', '.join(missing))
+    print('Rebuilt: ' + ', '.join(rebuilt) if rebuilt else 'Database is up to date')
+
+
+if __name__ == '__main__':
+    main()
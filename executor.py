@@ -0,0 +1,42 @@
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+FORMATS = ('test', 'odi', 't20')
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def pool():
+    """Return the process-wide pool used for per-format work.
+
+    Threads rather than processes: the per-format pieces are SQLite queries
+    and pandas/NumPy reductions that release the GIL, and they read the
+    in-process Dataset without copying it.
+    """
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = ThreadPoolExecutor(max_workers=max(len(FORMATS), os.cpu_count() or 1),
+                                       thread_name_prefix='per-format')
+        return _pool
+
+
+def _reset_after_fork():
+    # a forked child inherits the pool object but none of its threads
+    global _pool, _pool_lock
+    _pool = None
+    _pool_lock = threading.Lock()
+
+
+os.register_at_fork(after_in_child=_reset_after_fork)
+
+
+def per_format(fn, formats=FORMATS):
+    """Run ``fn(fmt)`` for every format concurrently and return {fmt: result}.
+
+    Wall time approaches that of the slowest format instead of the sum.
+    """
+    futures = {fmt: pool().submit(fn, fmt) for fmt in formats}
+    return {fmt: future.result() for fmt, future in futures.items()}
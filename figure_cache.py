@@ -0,0 +1,95 @@
+import argparse
+import os
+import shutil
+import tempfile
+
+from charts import CHARTS, render
+from metrics import METRICS
+
+FIGURE_DIR = 'figure_cache'
+IMAGE_FORMATS = ('png', 'svg')
+
+# Same options st.pyplot uses, so a cached PNG looks like the live figure
+SAVEFIG_OPTIONS = {'bbox_inches': 'tight', 'dpi': 200}
+
+
+def figure_path(chart, version, fmt='png', cache_dir=FIGURE_DIR, window=None):
+    """Rendered files live in one directory per data version; a chart drawn
+    for a window of seasons or dates is named after the window."""
+    name = chart.lower().replace(' ', '_')
+    if window:
+        name = f'{name}-{window.key()}'
+    return os.path.join(cache_dir, version, f'{name}.{fmt}')
+
+
+def save_figure(fig, path, fmt):
+    """Write a figure atomically, so readers never see a partial file."""
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    fd, tmp = tempfile.mkstemp(dir=os.path.dirname(path), suffix=f'.{fmt}.tmp')
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            fig.savefig(f, format=fmt, **SAVEFIG_OPTIONS)
+        os.chmod(tmp, 0o644)
+        os.replace(tmp, path)
+    except BaseException:
+        os.remove(tmp)
+        raise
+
+
+def cached_figure(chart, data, version, fmt='png', cache_dir=FIGURE_DIR):
+    """Return the path of a chart rendered from ``data``, rendering it on a miss."""
+    path = figure_path(chart, version, fmt, cache_dir, data.window)
+    with METRICS.timer('figure', chart, cache='hit') as event:
+        if not os.path.exists(path):
+            event['cache'] = 'miss'
+            save_figure(render(chart, data), path, fmt)
+    return path
+
+
+def evict_stale(version, cache_dir=FIGURE_DIR, keep=()):
+    """Remove figures rendered from any other data version than ``version``
+    and those in ``keep``."""
+    if not os.path.isdir(cache_dir):
+        return []
+    stale = [d for d in os.listdir(cache_dir) if d != version and d not in keep]
+    for d in stale:
+        shutil.rmtree(os.path.join(cache_dir, d), ignore_errors=True)
+    return stale
+
+
+def prerender(data, version, formats=('png',), cache_dir=FIGURE_DIR, keep=()):
+    """Render every chart for ``version`` so serving one is a file read."""
+    evict_stale(version, cache_dir, keep)
+    for chart in CHARTS:
+        fig = None
+        for fmt in formats:
+            path = figure_path(chart, version, fmt, cache_dir, data.window)
+            if os.path.exists(path):
+                continue
+            fig = fig or render(chart, data)
+            save_figure(fig, path, fmt)
+    return version
+
+
+def main(argv=None):
+    from backends import BACKENDS, configured_backend, open_backend
+    from dataset import load_dataset
+    from db_build import DB_PATH, build_database
+
+    parser = argparse.ArgumentParser(description="Pre-render the EDA charts for the current data version.")
+    parser.add_argument('--db', default=DB_PATH)
+    parser.add_argument('--backend', choices=BACKENDS, default=configured_backend())
+    parser.add_argument('--formats', nargs='+', choices=IMAGE_FORMATS, default=['png'])
+    parser.add_argument('--cache-dir', default=FIGURE_DIR)
+    parser.add_argument('--no-build', action='store_true',
+                        help="render from the existing database without rebuilding stale tables")
+    args = parser.parse_args(argv)
+    if args.backend == 'sqlite' and not args.no_build:
+        build_database(args.db)
+    version = open_backend(args.backend, args.db).version()
+    prerender(load_dataset(), version, args.formats, args.cache_dir)
+    print(f"Rendered {len(CHARTS)} charts for data version {version} into {args.cache_dir}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,210 @@
+import argparse
+import json
+import os
+import zipfile
+from concurrent.futures import ProcessPoolExecutor
+
+import pandas as pd
+
+import storage
+
+DATA_DIR = 'cricsheet_data'
+MANIFEST = 'ingest_manifest.json'
+
+# format prefix -> Cricsheet archive name
+FORMATS = {
+    'test': 'tests_json.zip',
+    'odi': 'odis_json.zip',
+    't20': 't20s_json.zip',
+}
+
+SUMMARY_COLUMNS = ['match_id', 'match_type', 'season', 'venue', 'city', 'start_date',
+                   'end_date', 'duration_days', 'team_1', 'team_2', 'toss_winner',
+                   'toss_decision', 'winner', 'player_of_match']
+INNINGS_COLUMNS = ['match_id', 'inning_team', 'over', 'ball_number', 'batsman', 'bowler',
+                   'non_striker', 'runs_scored', 'extras', 'total_runs', 'wicket_type',
+                   'player_out']
+
+
+def parse_match(data, match_id, summary, innings):
+    """Append one match to columnar buffers (dict of column -> list).
+
+    Produces the same rows as the notebook's process_json_file.
+    """
+    info = data['info']
+    match_dates = info.get('dates', ['Unknown'])
+    row = (match_id, info.get('match_type', 'Unknown'), info.get('season', 'Unknown'),
+           info.get('venue', 'Unknown'), info.get('city', 'Unknown'),
+           match_dates[0], match_dates[-1], len(match_dates),
+           info['teams'][0], info['teams'][1],
+           info['toss']['winner'], info['toss']['decision'],
+           info['outcome'].get('winner', 'No Result'),
+           info.get('player_of_match', ['None'])[0])
+    for col, value in zip(SUMMARY_COLUMNS, row):
+        summary[col].append(value)
+
+    cols = [innings[c] for c in INNINGS_COLUMNS]
+    (c_match, c_team, c_over, c_ball, c_bat, c_bowl, c_ns,
+     c_runs, c_extras, c_total, c_wkt, c_out) = cols
+    for inning in data.get('innings', []):
+        batting_team = inning['team']
+        for over in inning.get('overs', []):
+            over_number = over['over']
+            for ball_index, delivery in enumerate(over['deliveries'], start=1):
+                wickets = delivery.get('wickets')
+                runs = delivery['runs']
+                c_match.append(match_id)
+                c_team.append(batting_team)
+                c_over.append(over_number)
+                c_ball.append(round(over_number + (ball_index / 10), 1))
+                c_bat.append(delivery['batter'])
+                c_bowl.append(delivery['bowler'])
+                c_ns.append(delivery['non_striker'])
+                c_runs.append(runs['batter'])
+                c_extras.append(runs['extras'])
+                c_total.append(runs['total'])
+                if wickets:
+                    c_wkt.append(wickets[0].get('kind', 'Not Out'))
+                    c_out.append(wickets[0].get('player_out', 'No One'))
+                else:
+                    c_wkt.append('Not Out')
+                    c_out.append('No One')
+
+
+def match_id_of(name):
+    return os.path.basename(name).replace('.json', '')
+
+
+def parse_members(zip_path, names):
+    """Parse a batch of archive members into (summary, innings) DataFrames.
+
+    Runs inside a worker process; each worker opens the archive itself so
+    nothing but the member names and the resulting columns cross processes.
+    """
+    summary = {c: [] for c in SUMMARY_COLUMNS}
+    innings = {c: [] for c in INNINGS_COLUMNS}
+    with zipfile.ZipFile(zip_path) as zf:
+        for name in names:
+            data = json.loads(zf.read(name))
+            parse_match(data, match_id_of(name), summary, innings)
+    return pd.DataFrame(summary), pd.DataFrame(innings)
+
+
+def json_members(zip_path):
+    with zipfile.ZipFile(zip_path) as zf:
+        return sorted(n for n in zf.namelist() if n.endswith('.json'))
+
+
+def iter_batches(zip_path, names=None, workers=None, batch_size=200):
+    """Yield (summary, innings) DataFrame batches parsed across a process pool.
+
+    At most ``2 * workers`` batches are in flight at once, which bounds peak
+    memory independently of the archive size. Batches are yielded in order.
+    """
+    if names is None:
+        names = json_members(zip_path)
+    chunks = [names[i:i + batch_size] for i in range(0, len(names), batch_size)]
+    if not chunks:
+        return
+    workers = workers or os.cpu_count() or 1
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        pending = []
+        chunk_iter = iter(chunks)
+        for chunk in chunk_iter:
+            pending.append(pool.submit(parse_members, zip_path, chunk))
+            if len(pending) >= 2 * workers:
+                break
+        while pending:
+            yield pending.pop(0).result()
+            chunk = next(chunk_iter, None)
+            if chunk is not None:
+                pending.append(pool.submit(parse_members, zip_path, chunk))
+
+
+def member_checksums(zip_path):
+    """Return {member name: checksum} from the archive directory.
+
+    The CRC-32 and size are stored in the zip's central directory, so this
+    does not decompress anything.
+    """
+    with zipfile.ZipFile(zip_path) as zf:
+        return {i.filename: f'{i.CRC:08x}:{i.file_size}'
+                for i in zf.infolist() if i.filename.endswith('.json')}
+
+
+def load_manifest(out_dir='.'):
+    path = os.path.join(out_dir, MANIFEST)
+    if not os.path.exists(path):
+        return {}
+    with open(path, encoding='utf-8') as f:
+        return json.load(f)
+
+
+def save_manifest(manifest, out_dir='.'):
+    path = os.path.join(out_dir, MANIFEST)
+    tmp = path + '.tmp'
+    with open(tmp, 'w', encoding='utf-8') as f:
+        json.dump(manifest, f)
+    os.replace(tmp, path)
+
+
+def ingest_format(fmt, zip_path=None, out_dir='.', workers=None, batch_size=200,
+                  full=False, csv=False):
+    """Stream one Cricsheet archive into the format's summary and innings
+    partitions, split by season.
+
+    Only matches that are new, or whose checksum differs from the manifest,
+    are parsed. Part files holding a previous version of a changed match are
+    rewritten without it and the new rows are added as new parts, so a
+    refresh costs time in proportion to the new matches. With ``csv`` the
+    legacy ``*_matches_*.csv`` files are exported as well. Returns the
+    number of matches parsed.
+    """
+    zip_path = zip_path or os.path.join(DATA_DIR, FORMATS[fmt])
+    store_dir = os.path.join(out_dir, storage.STORE_DIR)
+    manifest = load_manifest(out_dir)
+    built = all(storage.exists(kind, fmt, store_dir) for kind in storage.KINDS)
+    seen = manifest.get(fmt, {}) if built and not full else {}
+    members = member_checksums(zip_path)
+    todo = sorted(n for n, ck in members.items() if seen.get(match_id_of(n)) != ck)
+    current = {match_id_of(n): ck for n, ck in members.items()}
+
+    if not seen:
+        for kind in storage.KINDS:
+            storage.clear(kind, fmt, store_dir)
+    # Besides changed and removed matches, drop the ones about to be parsed:
+    # a run that died before saving the manifest may have written them already
+    stale = {m for m in seen if current.get(m) != seen[m]} | {match_id_of(n) for n in todo}
+    if seen and stale:
+        for kind in storage.KINDS:
+            storage.drop_matches(kind, fmt, stale, store_dir)
+
+    for summary, innings in iter_batches(zip_path, todo, workers=workers, batch_size=batch_size):
+        storage.write_matches(fmt, summary, innings, store_dir)
+
+    manifest[fmt] = current
+    save_manifest(manifest, out_dir)
+    if csv:
+        for kind in storage.KINDS:
+            storage.export_csv(kind, fmt, out_dir, store_dir)
+    return len(todo)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Build the match store from Cricsheet JSON archives.')
+    parser.add_argument('--formats', nargs='+', choices=list(FORMATS), default=list(FORMATS))
+    parser.add_argument('--data-dir', default=DATA_DIR)
+    parser.add_argument('--out-dir', default='.')
+    parser.add_argument('--workers', type=int, default=None)
+    parser.add_argument('--batch-size', type=int, default=200)
+    parser.add_argument('--full', action='store_true', help='ignore the manifest and re-parse everything')
+    parser.add_argument('--csv', action='store_true', help='also export the *_matches_*.csv files')
+    args = parser.parse_args(argv)
+    for fmt in args.formats:
+        n = ingest_format(fmt, os.path.join(args.data_dir, FORMATS[fmt]), args.out_dir,
+                          args.workers, args.batch_size, args.full, args.csv)
+        print(f'{fmt}: {n} new or changed matches')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,161 @@
+import argparse
+
+import numpy as np
+import pandas as pd
+
+from streaks import _codes, in_match_order, innings_numbers
+
+# Bit widths of the value part of each search key; the innings (or batter
+# innings) number sits above them, so every key array is sorted
+OVER_BITS = 16
+SCORE_BITS = 20
+WICKET_BITS = 8
+RUN_BITS = 16
+
+
+def _starts(group):
+    """Positions where a new group begins in an array of contiguous groups."""
+    new = np.ones(len(group), bool)
+    new[1:] = group[1:] != group[:-1]
+    return np.flatnonzero(new), np.cumsum(new) - 1
+
+
+def _cumulative(values, starts, group):
+    """Running sum of ``values`` restarting at every group start."""
+    total = np.cumsum(values, dtype=np.int64)
+    before = np.concatenate(([0], total))[starts]
+    return total - before[group]
+
+
+def _search(keys, bits, groups, value, side='left'):
+    """Binary search every group for ``value``.
+
+    side='left' finds the first key >= (group, value), side='right' the
+    last key <= (group, value). Returns (index, found), where found is
+    False for groups that have no such key.
+    """
+    targets = (groups.astype(np.int64) << bits) | value
+    idx = np.searchsorted(keys, targets, side=side)
+    if side == 'right':
+        idx -= 1
+    found = (idx >= 0) & (idx < len(keys))
+    found[found] = (keys[idx[found]] >> bits) == groups[found]
+    return idx, found
+
+
+def _low(keys, bits):
+    return keys & ((1 << bits) - 1)
+
+
+class InningsState:
+    """Per-ball cumulative state of every innings, indexed for binary search.
+
+    Built once from an innings frame, taken in match order (each match's
+    deliveries as bowled, see streaks.match_order). For each delivery it
+    holds the team score and wickets down after the ball, and for each
+    batter innings the runs and balls faced so far. Every
+    quantity is packed with its innings number into a sorted int64 key, so
+    milestone questions are ``np.searchsorted`` calls rather than a
+    re-aggregation of the deliveries. Balls faced counts every delivery
+    the batter was on strike for, as the Batting aggregate does.
+    """
+
+    def __init__(self, innings):
+        innings = in_match_order(innings)
+        ids, number = innings_numbers(innings)
+        ids = ids.astype(np.int64) - 1
+        starts, _ = _starts(ids)
+        self.match_id = innings['match_id'].to_numpy()[starts]
+        self.number = number[starts]
+        self.inning_team = np.asarray(innings['inning_team'].take(starts), dtype=object)
+        self.ball_number = innings['ball_number'].to_numpy(dtype=np.float64).round(1)
+
+        runs = _cumulative(innings['total_runs'].to_numpy(), starts, ids)
+        wickets = _cumulative((innings['wicket_type'] != 'Not Out').to_numpy(), starts, ids)
+        self.over_key = (ids << OVER_BITS) | innings['over'].to_numpy(dtype=np.int64)
+        self.score_key = (ids << SCORE_BITS) | runs
+        self.wicket_key = (ids << WICKET_BITS) | wickets
+
+        codes, self.batters = _codes(innings['batsman'])
+        batter_key = ids * (len(self.batters) + 1) + codes
+        self.by_batter = np.argsort(batter_key, kind='stable')
+        self.batter_start, group = _starts(batter_key[self.by_batter])
+        first = self.by_batter[self.batter_start]
+        self.batter_innings = ids[first]
+        self.batter_code = codes[first]
+        batter_runs = _cumulative(innings['runs_scored'].to_numpy()[self.by_batter], self.batter_start, group)
+        self.reach_key = (group << RUN_BITS) | batter_runs
+
+    def _frame(self, innings, **columns):
+        return pd.DataFrame({'match_id': self.match_id[innings], 'innings': self.number[innings],
+                             'inning_team': self.inning_team[innings], **columns})
+
+    def balls_to_reach(self, runs):
+        """Every batter innings that reached ``runs``, with the balls it took."""
+        groups = np.arange(len(self.batter_start))
+        idx, found = _search(self.reach_key, RUN_BITS, groups, runs)
+        groups, idx = groups[found], idx[found]
+        return self._frame(self.batter_innings[groups],
+                           batsman=np.asarray(self.batters)[self.batter_code[groups]],
+                           balls=idx - self.batter_start[groups] + 1,
+                           runs=_low(self.reach_key[idx], RUN_BITS),
+                           at_ball=self.ball_number[self.by_batter[idx]])
+
+    def score_after(self, overs):
+        """Team score and wickets down after ``overs`` completed overs, for
+        every innings that got that far."""
+        groups = np.arange(len(self.match_id))
+        idx, found = _search(self.over_key, OVER_BITS, groups, overs - 1, side='right')
+        found &= _low(self.over_key[idx], OVER_BITS) == overs - 1
+        groups, idx = groups[found], idx[found]
+        return self._frame(groups, overs=overs, runs=_low(self.score_key[idx], SCORE_BITS),
+                           wickets=_low(self.wicket_key[idx], WICKET_BITS))
+
+    def wickets_at_score(self, score):
+        """Wickets down when each innings first reached ``score``."""
+        groups = np.arange(len(self.match_id))
+        idx, found = _search(self.score_key, SCORE_BITS, groups, score)
+        groups, idx = groups[found], idx[found]
+        return self._frame(groups, score=_low(self.score_key[idx], SCORE_BITS),
+                           wickets=_low(self.wicket_key[idx], WICKET_BITS), at_ball=self.ball_number[idx])
+
+    def fall_of_wicket(self, wicket):
+        """Team score when each innings lost its ``wicket``-th wicket."""
+        groups = np.arange(len(self.match_id))
+        idx, found = _search(self.wicket_key, WICKET_BITS, groups, wicket)
+        groups, idx = groups[found], idx[found]
+        return self._frame(groups, wicket=wicket, score=_low(self.score_key[idx], SCORE_BITS),
+                           at_ball=self.ball_number[idx])
+
+
+MILESTONES = {
+    'reach': InningsState.balls_to_reach,
+    'score-after': InningsState.score_after,
+    'wickets-at': InningsState.wickets_at_score,
+    'fall-of-wicket': InningsState.fall_of_wicket,
+}
+
+
+def main(argv=None):
+    import time
+
+    from dataset import FORMATS, load_dataset
+
+    parser = argparse.ArgumentParser(description='Answer milestone questions from the innings-state index.')
+    parser.add_argument('milestone', choices=list(MILESTONES))
+    parser.add_argument('value', type=int, help='runs, overs, score or wicket number')
+    parser.add_argument('--format', choices=FORMATS, default='odi')
+    parser.add_argument('--top', type=int, default=10)
+    args = parser.parse_args(argv)
+    innings = load_dataset().innings[args.format]
+    start = time.perf_counter()
+    state = InningsState(innings)
+    built = time.perf_counter() - start
+    start = time.perf_counter()
+    found = MILESTONES[args.milestone](state, args.value)
+    print(f'index built in {built:.3f}s, {len(found)} rows found in {time.perf_counter() - start:.4f}s')
+    print(found.head(args.top).to_string(index=False))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,134 @@
+import json
+import os
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+
+# Recent events kept in memory for the operator panel
+MAX_EVENTS = 500
+
+
+class Metrics:
+    """Thread-safe recorder of timed operations.
+
+    Every operation is an event with a ``kind`` (load, build, query, chart,
+    figure), a ``name`` and its wall time; callers add fields such as
+    ``rows``, ``rows_scanned``, ``cache`` or ``plan`` while it runs. Recent
+    events are kept for inspection and per-operation totals are kept for
+    the whole process. With ``log_path`` every event is also appended to
+    that file as a JSON line.
+    """
+
+    def __init__(self, max_events=MAX_EVENTS, log_path=None):
+        self.log_path = log_path
+        self._events = deque(maxlen=max_events)
+        self._totals = {}
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def timer(self, kind, name, **fields):
+        event = {'kind': kind, 'name': name, **fields}
+        start = time.perf_counter()
+        try:
+            yield event
+        except BaseException as e:
+            event['error'] = type(e).__name__
+            raise
+        finally:
+            event['wall_s'] = round(time.perf_counter() - start, 6)
+            event['ts'] = round(time.time(), 3)
+            self.record(event)
+
+    def record(self, event):
+        with self._lock:
+            self._events.append(event)
+            totals = self._totals.setdefault((event['kind'], event['name']), {
+                'count': 0, 'wall_s': 0.0, 'max_s': 0.0, 'rows': 0, 'errors': 0, 'cache': {}})
+            totals['count'] += 1
+            totals['wall_s'] += event['wall_s']
+            totals['max_s'] = max(totals['max_s'], event['wall_s'])
+            totals['rows'] += event.get('rows') or 0
+            totals['errors'] += 'error' in event
+            if 'cache' in event:
+                totals['cache'][event['cache']] = totals['cache'].get(event['cache'], 0) + 1
+            if self.log_path:
+                with open(self.log_path, 'a', encoding='utf-8') as f:
+                    f.write(json.dumps(event, default=str) + '\n')
+
+    def events(self, kind=None):
+        with self._lock:
+            return [dict(e) for e in self._events if kind is None or e['kind'] == kind]
+
+    def summary(self):
+        """Return one row per operation, slowest total first."""
+        with self._lock:
+            rows = [{'kind': kind, 'name': name, **{k: v for k, v in t.items() if k != 'cache'},
+                     **{f'cache_{status}': n for status, n in t['cache'].items()}}
+                    for (kind, name), t in self._totals.items()]
+        return sorted(rows, key=lambda r: r['wall_s'], reverse=True)
+
+    def jsonl(self):
+        return ''.join(json.dumps(e, default=str) + '\n' for e in self.events())
+
+    def prometheus(self, prefix='cricsheet'):
+        """Render the per-operation totals in the Prometheus text format."""
+        with self._lock:
+            totals = sorted(self._totals.items())
+        lines = [f'# HELP {prefix}_operation_seconds Wall time of instrumented operations.',
+                 f'# TYPE {prefix}_operation_seconds summary']
+        for (kind, name), t in totals:
+            labels = _labels(kind=kind, name=name)
+            lines.append(f'{prefix}_operation_seconds_sum{labels} {t["wall_s"]:.6f}')
+            lines.append(f'{prefix}_operation_seconds_count{labels} {t["count"]}')
+        for metric, key, kind_, help_ in (('operation_max_seconds', 'max_s', 'gauge', 'Slowest run of an operation.'),
+                                           ('operation_rows_total', 'rows', 'counter', 'Rows returned by an operation.'),
+                                           ('operation_errors_total', 'errors', 'counter', 'Failed runs of an operation.')):
+            lines.append(f'# HELP {prefix}_{metric} {help_}')
+            lines.append(f'# TYPE {prefix}_{metric} {kind_}')
+            for (kind, name), t in totals:
+                lines.append(f'{prefix}_{metric}{_labels(kind=kind, name=name)} {t[key]}')
+        lines.append(f'# HELP {prefix}_cache_requests_total Cache lookups by status.')
+        lines.append(f'# TYPE {prefix}_cache_requests_total counter')
+        for (kind, name), t in totals:
+            for status, n in sorted(t['cache'].items()):
+                lines.append(f'{prefix}_cache_requests_total{_labels(kind=kind, name=name, status=status)} {n}')
+        return '\n'.join(lines) + '\n'
+
+    def write_jsonl(self, path):
+        _write(path, self.jsonl())
+
+    def write_prometheus(self, path):
+        _write(path, self.prometheus())
+
+    def reset(self):
+        with self._lock:
+            self._events.clear()
+            self._totals.clear()
+
+
+def row_count(value):
+    """Rows in a frame, or in every frame of a {key: frame} dict."""
+    if hasattr(value, 'shape'):
+        return int(value.shape[0])
+    if isinstance(value, dict):
+        counts = [row_count(v) for v in value.values()]
+        return None if None in counts else sum(counts)
+    return None
+
+
+def _labels(**labels):
+    def escape(v):
+        return str(v).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+    return '{' + ','.join(f'{k}="{escape(v)}"' for k, v in labels.items()) + '}'
+
+
+def _write(path, content):
+    tmp = path + '.tmp'
+    with open(tmp, 'w', encoding='utf-8') as f:
+        f.write(content)
+    os.replace(tmp, path)
+
+
+# Process-wide recorder; set CRICSHEET_METRICS_LOG to also stream events to a file
+METRICS = Metrics(log_path=os.environ.get('CRICSHEET_METRICS_LOG'))
@@ -0,0 +1,253 @@
+import argparse
+
+import numpy as np
+import pandas as pd
+
+from executor import FORMATS, per_format
+from metrics import METRICS
+from streaks import NOT_BOWLER_WICKETS, _codes, innings_numbers
+
+# Columns of the innings frames a player can appear in
+PLAYER_ROLES = ('batsman', 'bowler', 'non_striker', 'player_out')
+NOT_A_PLAYER = 'No One'
+# Dismissals that do not end a batter's innings
+NOT_OUT = ('Not Out', 'retired hurt', 'retired not out')
+
+
+class Postings:
+    """Inverted list of one column: the sorted row positions of every value."""
+
+    def __init__(self, column):
+        codes, names = _codes(column)
+        codes = np.asarray(codes)
+        valid = np.flatnonzero(codes >= 0)
+        self.names = pd.Index(names)
+        self.rows = valid[np.argsort(codes[valid], kind='stable')]
+        counts = np.bincount(codes[valid], minlength=len(names))
+        self.offsets = np.concatenate(([0], np.cumsum(counts)))
+
+    def __getitem__(self, name):
+        code = self.names.get_indexer([name])[0]
+        if code < 0:
+            return self.rows[:0]
+        return self.rows[self.offsets[code]:self.offsets[code + 1]]
+
+    def present(self):
+        """Names that occur at least once."""
+        return self.names[np.diff(self.offsets) > 0]
+
+
+def row_ranges(rows):
+    """Collapse sorted row positions into [start, stop) ranges of consecutive rows."""
+    if not len(rows):
+        return np.empty((0, 2), np.int64)
+    breaks = np.flatnonzero(np.diff(rows) != 1) + 1
+    starts = np.concatenate(([0], breaks))
+    stops = np.concatenate((breaks, [len(rows)]))
+    return np.column_stack((rows[starts], rows[stops - 1] + 1))
+
+
+class PrefixIndex:
+    """Sorted, lower-cased name keys for autocomplete.
+
+    Every name is keyed by its full text and by each later word, so "koh"
+    finds "V Kohli". A prefix maps to a contiguous slice of the keys, found
+    with two binary searches.
+    """
+
+    def __init__(self, names):
+        keys, targets = [], []
+        for name, kind in names:
+            words = name.lower().split()
+            for i in range(len(words)):
+                keys.append(' '.join(words[i:]))
+                targets.append((name, kind))
+        order = np.argsort(keys, kind='stable')
+        self.keys = np.array(keys, dtype=str)[order]
+        self.targets = [targets[i] for i in order]
+
+    def complete(self, prefix, limit=10):
+        """Return up to ``limit`` (name, kind) pairs with a word starting with
+        ``prefix``; names that start with it come first, teams before players."""
+        prefix = ' '.join(prefix.lower().split())
+        if not prefix:
+            return []
+        lo = np.searchsorted(self.keys, prefix, side='left')
+        hi = np.searchsorted(self.keys, prefix + '\U0010ffff', side='left')
+        found = dict.fromkeys(self.targets[lo:hi])
+        return sorted(found, key=lambda t: (not t[0].lower().startswith(prefix), t[1] != 'team', t[0]))[:limit]
+
+
+class FormatIndex:
+    """Postings for one format: players by role, teams by batting innings and
+    by match, and the innings number of every delivery."""
+
+    def __init__(self, summary, innings):
+        self.summary = summary
+        self.innings = innings
+        self.roles = {role: Postings(innings[role]) for role in PLAYER_ROLES}
+        self.batting_team = Postings(innings['inning_team'])
+        self.team_matches = Postings(pd.concat([summary['team_1'], summary['team_2']], ignore_index=True))
+        self.innings_id = innings_numbers(innings)[0]
+        self.match_id = innings['match_id'].to_numpy()
+
+    def players(self):
+        names = set()
+        for postings in self.roles.values():
+            names.update(postings.present())
+        names.discard(NOT_A_PLAYER)
+        return names
+
+    def teams(self):
+        return set(self.team_matches.present()) | set(self.batting_team.present())
+
+    def player_rows(self, name):
+        """Sorted rows where ``name`` appears in any role."""
+        return np.unique(np.concatenate([postings[name] for postings in self.roles.values()]))
+
+    def player_matches(self, name):
+        return np.unique(self.match_id[self.player_rows(name)])
+
+    def team_summary(self, name):
+        rows = np.unique(self.team_matches[name] % len(self.summary))
+        return self.summary.iloc[rows]
+
+
+def _ratio(a, b, scale=1):
+    return round(float(a) * scale / b, 2) if b else None
+
+
+def batting_figures(index, name):
+    """Career batting of ``name`` in one format, or None if they never batted."""
+    innings = index.innings
+    faced = index.roles['batsman'][name]
+    dismissed = index.roles['player_out'][name]
+    dismissed = dismissed[~innings['wicket_type'].take(dismissed).isin(NOT_OUT).to_numpy()]
+    if not len(faced) and not len(dismissed):
+        return None
+    runs = innings['runs_scored'].to_numpy()[faced].astype(np.int64)
+    batted = np.union1d(index.innings_id[faced], index.innings_id[dismissed])
+    scores = pd.Series(runs).groupby(index.innings_id[faced]).sum().reindex(batted, fill_value=0)
+    return {'innings': len(batted), 'runs': int(runs.sum()), 'balls': len(faced),
+            'outs': len(dismissed), 'average': _ratio(runs.sum(), len(dismissed)),
+            'strike_rate': _ratio(runs.sum(), len(faced), 100), 'highest': int(scores.max()),
+            'hundreds': int((scores >= 100).sum()), 'fifties': int(scores.between(50, 99).sum()),
+            'fours': int((runs == 4).sum()), 'sixes': int((runs == 6).sum())}
+
+
+def bowling_figures(index, name):
+    """Career bowling of ``name`` in one format, or None if they never bowled.
+
+    Only dismissals credited to the bowler count as wickets.
+    """
+    innings = index.innings
+    bowled = index.roles['bowler'][name]
+    if not len(bowled):
+        return None
+    runs = innings['total_runs'].to_numpy()[bowled].astype(np.int64)
+    wickets = (~innings['wicket_type'].take(bowled).isin(NOT_BOWLER_WICKETS)).to_numpy()
+    spells = pd.DataFrame({'wickets': wickets, 'runs': runs}).groupby(index.innings_id[bowled]).sum()
+    best = spells.sort_values(['wickets', 'runs'], ascending=[False, True]).iloc[0]
+    return {'innings': len(spells), 'balls': len(bowled), 'runs': int(runs.sum()),
+            'wickets': int(wickets.sum()), 'average': _ratio(runs.sum(), wickets.sum()),
+            'economy': _ratio(runs.sum(), len(bowled), 6), 'strike_rate': _ratio(len(bowled), wickets.sum()),
+            'best': f"{best['wickets']}/{best['runs']}", 'five_wickets': int((spells['wickets'] >= 5).sum())}
+
+
+def team_figures(index, name):
+    """Results and batting of team ``name`` in one format, or None if it never played."""
+    played = index.team_summary(name)
+    if not len(played):
+        return None
+    faced = index.batting_team[name]
+    runs = index.innings['total_runs'].to_numpy()[faced].astype(np.int64)
+    totals = pd.Series(runs).groupby(index.innings_id[faced]).sum()
+    won = int((played['winner'] == name).sum())
+    no_result = int((played['winner'] == 'No Result').sum())
+    return {'matches': len(played), 'won': won, 'lost': len(played) - won - no_result,
+            'no_result': no_result, 'win_pct': _ratio(won, len(played) - no_result, 100),
+            'innings': len(totals), 'runs': int(runs.sum()), 'run_rate': _ratio(runs.sum(), len(faced), 6),
+            'highest_total': int(totals.max()) if len(totals) else None,
+            'first_match': played['start_date'].min(), 'last_match': played['start_date'].max()}
+
+
+class ProfileIndex:
+    """Player and team lookup over every format of a Dataset.
+
+    Built once per data version: per format, the sorted row positions of
+    every player (as batter, bowler, non-striker or dismissed player) and
+    team, plus a prefix index over all names. A profile then reads only
+    the rows of one name instead of scanning the innings tables. The
+    positions point into the frames of one in-memory Dataset, so the
+    index is built by the process serving them on first use rather than
+    stored with the database.
+    """
+
+    def __init__(self, data, formats=FORMATS):
+        with METRICS.timer('profile', 'index') as event:
+            self.formats = per_format(lambda fmt: FormatIndex(data.summary[fmt], data.innings[fmt]), formats)
+            self.players = set().union(*(index.players() for index in self.formats.values()))
+            self.teams = set().union(*(index.teams() for index in self.formats.values()))
+            self.names = PrefixIndex([(n, 'player') for n in sorted(self.players)]
+                                     + [(n, 'team') for n in sorted(self.teams)])
+            event['players'] = len(self.players)
+            event['teams'] = len(self.teams)
+
+    def complete(self, prefix, limit=10):
+        return self.names.complete(prefix, limit)
+
+    def rows(self, name):
+        """{fmt: [start, stop) row ranges of the innings frame} where a player appears."""
+        return {fmt: row_ranges(index.player_rows(name)) for fmt, index in self.formats.items()}
+
+    def matches(self, name):
+        """{fmt: match ids} a player appeared in or a team played."""
+        if name in self.teams:
+            return {fmt: index.team_summary(name)['match_id'].to_numpy() for fmt, index in self.formats.items()}
+        return {fmt: index.player_matches(name) for fmt, index in self.formats.items()}
+
+    def _table(self, figures, name):
+        rows = {fmt.upper(): figures(index, name) for fmt, index in self.formats.items()}
+        return pd.DataFrame.from_dict({k: v for k, v in rows.items() if v}, orient='index')
+
+    def player_profile(self, name):
+        """{'matches': per-format match counts, 'batting': ..., 'bowling': ...} as DataFrames."""
+        with METRICS.timer('profile', 'player'):
+            matches = pd.Series({fmt.upper(): len(ids) for fmt, ids in self.matches(name).items() if len(ids)},
+                                name='matches', dtype='int64')
+            return {'matches': matches, 'batting': self._table(batting_figures, name),
+                    'bowling': self._table(bowling_figures, name)}
+
+    def team_profile(self, name):
+        with METRICS.timer('profile', 'team'):
+            return {'results': self._table(team_figures, name)}
+
+    def profile(self, name):
+        return self.team_profile(name) if name in self.teams else self.player_profile(name)
+
+
+def main(argv=None):
+    import time
+
+    from dataset import load_dataset
+
+    parser = argparse.ArgumentParser(description='Look up a player or team and print their profile.')
+    parser.add_argument('name', help='a full name, or a prefix with --complete')
+    parser.add_argument('--complete', action='store_true', help='list the names matching a prefix')
+    args = parser.parse_args(argv)
+    start = time.perf_counter()
+    index = ProfileIndex(load_dataset())
+    print(f'index built in {time.perf_counter() - start:.3f}s')
+    if args.complete:
+        for name, kind in index.complete(args.name):
+            print(f'{name} ({kind})')
+        return
+    start = time.perf_counter()
+    profile = index.profile(args.name)
+    print(f'profile computed in {(time.perf_counter() - start) * 1000:.1f}ms')
+    for title, table in profile.items():
+        print(f'\n{title}\n{table.to_string()}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,410 @@
+import argparse
+import re
+import sys
+
+import pandas as pd
+
+from executor import FORMATS, per_format
+from metrics import METRICS
+from streaks import dot_ball_streaks, longest
+
+# Question catalog shown in the "SQL Queries & Insights" tabs, and the SQL behind each question
+QUEST = {
+    'Test': {
+        'Q1': 'Who are the top 10 highest run scorers?',
+        'Q2': 'Who are the top 10 most successful wicket-takers?',
+        'Q3': 'Which batsmen have the best strike rate (ones who faced more than 500 balls)?',
+        'Q4': 'What are the total runs scored by each team in each test match?',
+        'Q5': 'What are the runs scored (or wicket taken) by the player of the match in each test match?',
+        'Q6': 'Which test matches have happened for more than 4 days and the total overs for these matches?',
+    },
+    'ODI': {
+        'Q1': 'What are the top 10 highest team total in ODI matches?',
+        'Q2': "What are the top 15 'fastest 50s' in ODI history?",
+        'Q3': 'Who are the top 10 bowlers who have taken most number of wickets in lost ODI matches?',
+        'Q4': 'Who are the top 10 highest run scorers in winning matches?',
+        'Q5': 'Who are the top 5 batsmen with the most centuries in ODI matches?',
+        'Q6': 'Which teams have won most of the matches (select top 5) when they were chasing teams?',
+    },
+    'T20': {
+        'Q1': 'What is the average strike rate of each team for each T20 match?',
+        'Q2': 'What are the top 10 highest runs scored in the powerplay?',
+        'Q3': 'How many teams have the team won while losing less than 5 wickets?',
+        'Q4': 'Which teams have scored the most number of runs in death overs (last 5 overs)?',
+        'Q5': 'Which top 10 bowlers had the worst economy in a single match?',
+        'Q6': 'Who are the top 10 bowlers who bowled the most consecutive dot balls in a single T20 match?',
+    },
+    'Common': {
+        'Q1': 'List all the winners of the Test, ODI and T20 matches.',
+        'Q2': 'Which are the top 10 teams that have won most matches in all the three formats?',
+    },
+}
+
+QUERY = {
+    'Test': {
+        'Q1': '''select batsman, sum(runs) AS total_runs_scored
+            from test_batting
+            group by batsman
+            order by total_runs_scored desc, batsman
+            limit 10;''',
+        'Q2': '''select bowler, sum(wickets) as total_wickets
+            from test_bowling
+            group by bowler
+            order by total_wickets desc, bowler
+            limit 10;''',
+        'Q3': '''SELECT batsman,
+            SUM(runs) * 100.0 / SUM(balls) AS strike_rate
+            FROM test_batting
+            GROUP BY batsman
+            HAVING SUM(balls) >= 500
+            ORDER BY strike_rate DESC, batsman
+            LIMIT 10;''',
+        'Q4': '''SELECT tm.season,tm.start_date,tm.end_date, tt.inning_team, tt.runs AS total_runs_scored
+            FROM test_summary tm
+            JOIN test_team_totals tt ON tm.match_id = tt.match_id
+            ORDER BY tt.match_id;''',
+        'Q5': '''SELECT tm.season,tm.start_date,tm.end_date,tm.team_1,
+            tm.team_2,tm.winner, tm.player_of_match,
+            COALESCE(bat.runs, 0) AS total_runs,
+            COALESCE(bowl.wickets, 0) AS total_wickets
+            FROM test_summary tm
+            LEFT JOIN test_batting bat ON bat.match_id = tm.match_id AND bat.batsman = tm.player_of_match
+            LEFT JOIN test_bowling bowl ON bowl.match_id = tm.match_id AND bowl.bowler = tm.player_of_match
+            where tm.winner != 'No Result' and tm.player_of_match != 'None'
+            ORDER BY total_runs DESC, total_wickets DESC;''',
+        'Q6': '''select tm.season, tm.start_date, tm.duration_days,
+            tm.team_1, tm.team_2, count(distinct ti.over) as total_overs
+            from test_summary tm
+            join test_innings ti on tm.match_id=ti.match_id
+            where tm.duration_days > 4
+            group by tm.match_id, tm.season, tm.start_date, tm.duration_days, tm.team_1, tm.team_2;''',
+    },
+    'ODI': {
+        'Q1': '''SELECT om.season, om.start_date, om.team_1, om.team_2, team_tot.inning_team, team_tot.total_score
+            FROM odi_summary om
+            JOIN(SELECT match_id, inning_team, runs AS total_score
+            FROM odi_team_totals
+            ORDER BY total_score DESC, match_id, inning_team
+            LIMIT 10) AS team_tot ON om.match_id = team_tot.match_id;''',
+        'Q3': '''SELECT ob.bowler, SUM(ob.wickets) AS total_wickets
+            FROM odi_summary om
+            JOIN odi_bowling ob ON om.match_id = ob.match_id
+            WHERE (
+                (ob.inning_team = om.team_1 AND om.winner = om.team_2)
+                OR
+                (ob.inning_team = om.team_2 AND om.winner = om.team_1)
+            )
+            GROUP BY ob.bowler
+            HAVING total_wickets > 0
+            ORDER BY total_wickets DESC, ob.bowler
+            LIMIT 10;''',
+        'Q4': '''SELECT ob.batsman, SUM(ob.runs) AS total_runs_scored
+            FROM odi_summary om
+            JOIN odi_batting ob ON om.match_id = ob.match_id
+            WHERE om.winner = ob.inning_team
+            GROUP BY ob.batsman
+            ORDER BY total_runs_scored DESC, ob.batsman
+            LIMIT 10;''',
+        'Q5': '''SELECT batsman, COUNT(*) AS centuries
+            FROM odi_batting
+            WHERE runs >= 100
+            GROUP BY batsman
+            ORDER BY centuries DESC, batsman
+            LIMIT 5;''',
+        'Q6': '''SELECT winner, COUNT(*) AS chases_won
+            FROM odi_summary
+            WHERE toss_decision = 'field'
+            GROUP BY winner
+            ORDER BY chases_won DESC, winner
+            LIMIT 5;''',
+    },
+    'T20': {
+        'Q1': '''SELECT tm.season, tm.start_date, tm.team_1, tm.team_2, str_rat.inning_team, str_rat.avg_strike_rate
+            FROM t20_summary tm
+            JOIN(SELECT match_id, inning_team,
+            runs * 100.0 / balls AS avg_strike_rate
+            FROM t20_team_totals) AS str_rat ON tm.match_id=str_rat.match_id;''',
+        'Q2': '''SELECT tm.season, tm.start_date, tm.team_1, tm.team_2, pow_ply.inning_team, pow_ply.powerplay_runs
+            FROM t20_summary tm
+            JOIN(SELECT match_id, inning_team, powerplay_runs
+                 FROM t20_team_totals
+                 ORDER BY powerplay_runs DESC, match_id, inning_team
+                 LIMIT 10) AS pow_ply ON tm.match_id=pow_ply.match_id;''',
+        'Q3': '''SELECT tm.winner, COUNT(*) AS times_won
+            FROM t20_summary tm
+            JOIN t20_team_totals tt ON tm.match_id = tt.match_id
+            WHERE tm.winner = tt.inning_team AND tt.wickets > 0 AND tt.wickets < 5
+            GROUP BY tm.winner
+            ORDER BY times_won DESC;''',
+        'Q4': '''SELECT tm.season, tm.start_date, tm.team_1, tm.team_2, death_ov.inning_team, death_ov.death_overs_runs
+            FROM t20_summary tm
+            JOIN(SELECT match_id, inning_team, death_runs AS death_overs_runs
+            FROM t20_team_totals
+            ORDER BY death_overs_runs DESC, match_id, inning_team
+            LIMIT 5) AS death_ov ON tm.match_id=death_ov.match_id;''',
+        'Q5': '''SELECT tm.season, tm.start_date, tm.team_1, tm.team_2, worst_ec.bowler, worst_ec.runs_conceded
+            FROM t20_SUmmary tm
+            JOIN(SELECT match_id, bowler, runs_conceded
+            FROM t20_bowling
+            ORDER BY runs_conceded DESC, match_id, bowler
+            LIMIT 10) AS worst_ec on tm.match_id = worst_ec.match_id;''',
+    },
+    'Common': {
+        'Q1': '''select match_type, team_1, team_2, winner
+            from Test_Summary
+            union all
+            select match_type, team_1, team_2, winner
+            from ODI_Summary
+            union all
+            select match_type, team_1, team_2, winner
+            from T20_Summary''',
+        'Q2': '''select winner, count(*) as total_wins
+            from (
+                  select winner from test_summary
+                  union all
+                  select winner from odi_summary
+                  union all
+                  select winner from t20_Summary
+                  ) AS all_matches
+            where winner != 'No Result'
+            GROUP BY winner
+            ORDER BY total_wins DESC, winner limit 10;''',
+    },
+}
+
+
+INNINGS_TABLES = ('test_innings', 'odi_innings', 't20_innings')
+SUMMARY_TABLES = {'test': 'Test_Summary', 'odi': 'ODI_Summary', 't20': 'T20_Summary'}
+
+
+def _concat(parts):
+    return pd.concat([parts[fmt] for fmt in FORMATS], ignore_index=True)
+
+
+def _top_wins(parts):
+    wins = _concat(parts).groupby('winner', as_index=False)['total_wins'].sum()
+    return wins.sort_values('total_wins', ascending=False, kind='stable').head(10).reset_index(drop=True)
+
+
+# Multi-format questions as independent per-format statements plus a merge
+# step, so the formats run concurrently on separate pooled connections. The
+# UNION ALL statements in QUERY stay the reference form of these questions.
+SPLIT = {
+    'Common': {
+        'Q1': ('select match_type, team_1, team_2, winner from {table}', _concat),
+        'Q2': ('''select winner, count(*) as total_wins from {table}
+                  where winner != 'No Result' group by winner''', _top_wins),
+    },
+}
+
+
+MATCH_COLUMNS = ['match_id', 'season', 'start_date', 'team_1', 'team_2']
+
+
+def _dot_streaks(data, fmt):
+    best = longest(dot_ball_streaks(data.innings[fmt]), 10, per=('match_id',))
+    best = best.merge(data.summary[fmt][MATCH_COLUMNS], on='match_id', how='left')
+    return best[['season', 'start_date', 'team_1', 'team_2', 'bowler', 'length']].rename(
+        columns={'length': 'consecutive_dot_balls'})
+
+
+def _fastest_fifties(data, fmt):
+    reached = data.states[fmt].balls_to_reach(50)
+    best = reached.sort_values(['balls', 'runs', 'match_id', 'batsman'],
+                               ascending=[True, False, True, True], kind='stable').head(15)
+    best = best.merge(data.summary[fmt][MATCH_COLUMNS], on='match_id', how='left')
+    return best[['season', 'start_date', 'team_1', 'team_2', 'batsman', 'balls', 'runs']].rename(
+        columns={'balls': 'balls_faced', 'runs': 'total_runs_scored'}).reset_index(drop=True)
+
+
+# Questions about the order of deliveries, answered by the streak engine or
+# the innings-state index (see innings_state) over one format of a Dataset:
+# {qid: (format, function of (dataset, format))}. The app and the report
+# pass the shared Dataset, whose index is built once per data version and
+# window; without one the format's tables are read from the backend.
+COMPUTED = {
+    'ODI': {'Q2': ('odi', _fastest_fifties)},
+    'T20': {'Q6': ('t20', _dot_streaks)},
+}
+
+
+def _computed_statements(fmt):
+    return {'summary': f'SELECT {", ".join(MATCH_COLUMNS)} FROM {fmt}_summary',
+            'innings': f'''SELECT match_id, inning_team, over, ball_number, batsman, bowler, runs_scored,
+                                 extras, total_runs, wicket_type
+                          FROM {fmt}_innings'''}
+
+
+def run_query(backend, fmt, qid, params=None, window=None, data=None):
+    """Run a catalog question on a backend (see backends.open_backend),
+    optionally restricted to a storage.Window of seasons or dates.
+
+    Questions in COMPUTED use ``data``, a Dataset holding the same window,
+    when one is given.
+    """
+    if qid in COMPUTED.get(fmt, {}):
+        source, compute = COMPUTED[fmt][qid]
+        if data is None:
+            from dataset import from_frames
+
+            frames = {name: {source: backend.read_sql(sql, params, window)}
+                      for name, sql in _computed_statements(source).items()}
+            data = from_frames(frames['summary'], frames['innings'], window)
+        return compute(data, source)
+    if qid in SPLIT.get(fmt, {}):
+        sql, merge = SPLIT[fmt][qid]
+        parts = per_format(lambda f: backend.read_sql(sql.format(table=SUMMARY_TABLES[f]), params, window))
+        return merge(parts)
+    return backend.read_sql(QUERY[fmt][qid], params, window)
+
+
+def statements(fmt, qid):
+    """Return the SQL statements run_query executes for a question (without
+    a Dataset)."""
+    if qid in COMPUTED.get(fmt, {}):
+        return list(_computed_statements(COMPUTED[fmt][qid][0]).values())
+    if qid in SPLIT.get(fmt, {}):
+        sql = SPLIT[fmt][qid][0]
+        return [sql.format(table=SUMMARY_TABLES[f]) for f in FORMATS]
+    return [QUERY[fmt][qid]]
+
+
+def cached_query(cache, backend, version, fmt, qid, params=None, window=None, data=None):
+    """Run a catalog query through a shared ResultCache keyed by data version
+    and window; ``data`` is the Dataset of that version and window.
+
+    Each call is recorded in METRICS with its cache status and the rows
+    returned; a miss also records the query plan and an estimate of the
+    rows it scans.
+    """
+    key = (version, fmt, qid, tuple(sorted(params.items())) if params else None, window.key() if window else None)
+    with METRICS.timer('query', f'{fmt} {qid}', cache='hit', backend=backend.name,
+                       window=window.key() if window else None) as event:
+        def compute():
+            event['cache'] = 'miss'
+            df = run_query(backend, fmt, qid, params, window, data)
+            sqls = [] if data is not None and qid in COMPUTED.get(fmt, {}) else statements(fmt, qid)
+            event.update(plan_stats(backend, [backend.restrict(sql, window) if window else sql for sql in sqls]))
+            return df
+        df = cache.get(key, compute)
+        event['rows'] = len(df)
+    return df
+
+
+def explain(engine, sql):
+    """Return the detail lines of EXPLAIN QUERY PLAN for a statement."""
+    with engine.connect() as conn:
+        rows = conn.exec_driver_sql('EXPLAIN QUERY PLAN ' + sql.rstrip().rstrip(';')).fetchall()
+    return [r[-1] for r in rows]
+
+
+_NOT_ALIASES = {'where', 'group', 'order', 'join', 'inner', 'left', 'cross', 'on', 'limit',
+                'union', 'having', 'natural', 'using'}
+
+
+def _aliases(sql):
+    aliases = {}
+    for table, alias in re.findall(r'\b(?:FROM|JOIN)\s+(\w+)(?:\s+(?:AS\s+)?(\w+))?', sql, re.I):
+        if alias and alias.lower() not in _NOT_ALIASES:
+            aliases[alias.lower()] = table.lower()
+    return aliases
+
+
+def scan_estimate(plan, stats, aliases=None):
+    """Estimate the rows a plan reads from the ANALYZE statistics.
+
+    A SCAN counts every row of the table (or covering index); a SEARCH
+    counts the average rows per value of the equality-constrained index
+    prefix. Loop fan-out of joins is not multiplied in, so this is a lower
+    bound for nested lookups.
+    """
+    aliases = aliases or {}
+    total = 0
+    for line in plan:
+        m = re.match(r'(SCAN|SEARCH) (\w+)(?: USING (?:COVERING |INTEGER PRIMARY KEY )?(?:INDEX (\w+) )?\((.*)\))?', line)
+        if not m:
+            continue
+        op, name, index, cond = m.groups()
+        entry = stats.get((index or '').lower()) or stats.get(aliases.get(name.lower(), name.lower()))
+        if entry is None:
+            continue
+        numbers = entry[1]
+        equal = len(re.findall(r'=\?', cond or '')) if op == 'SEARCH' else 0
+        total += numbers[min(equal, len(numbers) - 1)]
+    return total
+
+
+def plan_stats(backend, sqls):
+    """Return {'plan': lines, 'rows_scanned': estimate} for statements run together.
+
+    The estimate needs planner statistics; it is None on backends without them.
+    """
+    stats = backend.index_stats()
+    plan, scanned = [], 0
+    for sql in sqls:
+        lines = backend.explain(sql)
+        plan.extend(lines)
+        scanned += scan_estimate(lines, stats, _aliases(sql))
+    return {'plan': plan, 'rows_scanned': scanned if stats else None}
+
+
+def _innings_names(sql):
+    names = set(INNINGS_TABLES)
+    for table, alias in re.findall(r'(\w+_innings)\s+(?:AS\s+)?(\w+)', sql, re.I):
+        if table.lower() in INNINGS_TABLES:
+            names.add(alias.lower())
+    return names
+
+
+def full_scans(engine):
+    """Return {(fmt, qid): plan lines} for catalog queries that scan an
+    innings table row by row instead of searching or covering it with an index."""
+    offenders = {}
+    for fmt, queries in QUERY.items():
+        for qid, sql in queries.items():
+            names = _innings_names(sql)
+            bad = [line for line in explain(engine, sql)
+                   if line.startswith('SCAN ') and 'INDEX' not in line
+                   and line.split()[1].lower() in names]
+            if bad:
+                offenders[(fmt, qid)] = bad
+    return offenders
+
+
+def main(argv=None):
+    from db_build import open_readonly
+
+    parser = argparse.ArgumentParser(description='Inspect the query plans of the question catalog.')
+    parser.add_argument('--db', default='cricket_data.db')
+    parser.add_argument('--check-plans', action='store_true',
+                        help='exit non-zero if any query scans a full innings table')
+    parser.add_argument('--check-parity', action='store_true',
+                        help='exit non-zero unless every question returns the same rows on SQLite and DuckDB')
+    parser.add_argument('--seasons', nargs='+', default=None, help='check parity within these seasons only')
+    args = parser.parse_args(argv)
+    if args.check_parity:
+        from backends import DuckDBBackend, SQLiteBackend, parity
+        from storage import Window
+
+        window = Window(tuple(args.seasons)) if args.seasons else None
+        mismatches = parity(SQLiteBackend(args.db), DuckDBBackend(), window=window)
+        for (fmt, qid), reason in mismatches.items():
+            print(f'MISMATCH {fmt} {qid}: {reason}')
+        print(f'{sum(map(len, QUEST.values())) - len(mismatches)} questions match')
+        return 1 if mismatches else 0
+    engine = open_readonly(args.db)
+    for fmt, queries in QUERY.items():
+        for qid, sql in queries.items():
+            print(f'{fmt} {qid}')
+            for line in explain(engine, sql):
+                print('    ' + line)
+    if args.check_plans:
+        offenders = full_scans(engine)
+        for (fmt, qid), lines in offenders.items():
+            print(f'FULL SCAN {fmt} {qid}: ' + '; '.join(lines))
+        return 1 if offenders else 0
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,220 @@
+import argparse
+import datetime
+import fcntl
+import json
+import os
+import shutil
+import sqlite3
+import time
+
+import ingest
+import storage
+from db_build import DB_PATH, build_database
+from metrics import METRICS
+
+SNAPSHOT_DIR = 'snapshots'
+CURRENT = 'CURRENT.json'
+SNAPSHOT_META = 'snapshot.json'
+LOCK = '.refresh.lock'
+KEEP = 2
+
+
+def current(root='.'):
+    """Return the metadata of the snapshot being served, or None if the
+    refresh worker has not published one yet."""
+    try:
+        with open(os.path.join(root, SNAPSHOT_DIR, CURRENT), encoding='utf-8') as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return None
+
+
+def paths(snapshot, root='.'):
+    """Return (database path, store directory) of a snapshot, or of the live
+    files when ``snapshot`` is None."""
+    if snapshot is None:
+        return os.path.join(root, DB_PATH), os.path.join(root, storage.STORE_DIR)
+    base = os.path.join(root, SNAPSHOT_DIR, snapshot['name'])
+    return os.path.join(base, DB_PATH), os.path.join(base, storage.STORE_DIR)
+
+
+def _write_json(path, data):
+    tmp = path + '.tmp'
+    with open(tmp, 'w', encoding='utf-8') as f:
+        json.dump(data, f, indent=1)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp, path)
+
+
+def link_store(src, dst):
+    """Mirror a store directory with hard links.
+
+    Part files are immutable, so a snapshot can share them with the working
+    store; later ingests replace or delete the working names only.
+    """
+    for root, _, files in os.walk(src):
+        target = os.path.join(dst, os.path.relpath(root, src))
+        os.makedirs(target, exist_ok=True)
+        for name in files:
+            if not name.endswith('.parquet'):
+                continue
+            try:
+                os.link(os.path.join(root, name), os.path.join(target, name))
+            except OSError:
+                shutil.copy2(os.path.join(root, name), os.path.join(target, name))
+
+
+def copy_database(src, dst):
+    """Consistent copy of a SQLite database, even while others read it."""
+    source = sqlite3.connect(f'file:{src}?mode=ro', uri=True)
+    target = sqlite3.connect(dst)
+    try:
+        source.backup(target)
+    finally:
+        target.close()
+        source.close()
+
+
+def warm(db_path, store_dir, version, keep_versions=(), figures=True, root='.'):
+    """Run every catalog question once, build the profile index and
+    pre-render the charts for a new snapshot. A failure here stops the swap."""
+    from backends import SQLiteBackend
+    from dataset import load_dataset
+    from profiles import ProfileIndex
+    from queries import QUEST, run_query
+
+    data = load_dataset(store_dir)
+    backend = SQLiteBackend(db_path)
+    try:
+        for fmt, quest in QUEST.items():
+            for qid in quest:
+                with METRICS.timer('refresh', f'warm {fmt} {qid}'):
+                    run_query(backend, fmt, qid, data=data)
+    finally:
+        backend.dispose()
+    with METRICS.timer('refresh', 'warm profiles'):
+        ProfileIndex(data)
+    if figures:
+        from figure_cache import FIGURE_DIR, prerender
+
+        with METRICS.timer('refresh', 'warm figures'):
+            prerender(data, version, cache_dir=os.path.join(root, FIGURE_DIR), keep=keep_versions)
+
+
+def prune_snapshots(root='.', keep=KEEP):
+    """Delete all but the ``keep`` newest snapshots; returns the kept names.
+
+    Sessions still holding an older snapshot keep reading it, since open
+    files outlive their directory entries.
+    """
+    base = os.path.join(root, SNAPSHOT_DIR)
+    names = sorted(d for d in os.listdir(base) if os.path.isdir(os.path.join(base, d)))
+    serving = (current(root) or {}).get('name')
+    kept = names[-keep:]
+    if serving and serving not in kept:
+        kept.append(serving)
+    for name in names:
+        if name not in kept:
+            shutil.rmtree(os.path.join(base, name), ignore_errors=True)
+    return kept
+
+
+def _versions(root, names):
+    versions = []
+    for name in names:
+        try:
+            with open(os.path.join(root, SNAPSHOT_DIR, name, SNAPSHOT_META), encoding='utf-8') as f:
+                versions.append(json.load(f)['version'])
+        except (FileNotFoundError, KeyError, ValueError):
+            pass
+    return versions
+
+
+def refresh(data_dir=ingest.DATA_DIR, root='.', formats=tuple(ingest.FORMATS), workers=None,
+            memory_budget=None, keep=KEEP, figures=True, force=False):
+    """Ingest new matches and publish them as a new snapshot.
+
+    Ingestion updates the working store under ``root``; the snapshot gets
+    hard links to its parts and a copy of the previous snapshot's database,
+    which is then brought up to date incrementally. After the snapshot
+    answers every catalog question (and its charts are rendered) it is
+    swapped in by atomically replacing the CURRENT pointer, so the app
+    never reads a database that is being written. Returns the served
+    snapshot's metadata.
+    """
+    from backends import SQLiteBackend
+
+    base = os.path.join(root, SNAPSHOT_DIR)
+    os.makedirs(base, exist_ok=True)
+    with open(os.path.join(base, LOCK), 'w') as lock, METRICS.timer('refresh', 'snapshot') as event:
+        fcntl.flock(lock, fcntl.LOCK_EX)
+        with METRICS.timer('refresh', 'ingest'):
+            changed = sum(ingest.ingest_format(fmt, os.path.join(data_dir, ingest.FORMATS[fmt]), root, workers)
+                          for fmt in formats)
+        event['matches'] = changed
+        previous = current(root)
+        if previous and not changed and not force:
+            return previous
+
+        name = datetime.datetime.now(datetime.timezone.utc).strftime('%Y%m%dT%H%M%S%fZ')
+        snapshot = {'name': name}
+        db_path, store_dir = paths(snapshot, root)
+        try:
+            with METRICS.timer('refresh', 'link store'):
+                link_store(os.path.join(root, storage.STORE_DIR), store_dir)
+            if previous:
+                copy_database(paths(previous, root)[0], db_path)
+            with METRICS.timer('refresh', 'build'):
+                build_database(db_path, os.path.dirname(db_path), memory_budget)
+            backend = SQLiteBackend(db_path)
+            version = backend.version()
+            backend.dispose()
+            # figures of the snapshots that stay on disk survive the pre-render
+            kept = sorted(d for d in os.listdir(base) if os.path.isdir(os.path.join(base, d)))[-keep:]
+            if previous:
+                kept.append(previous['name'])
+            warm(db_path, store_dir, version, _versions(root, kept), figures, root)
+        except BaseException:
+            # a failed snapshot is never published; the previous one stays current
+            shutil.rmtree(os.path.join(base, name), ignore_errors=True)
+            raise
+
+        snapshot.update(version=version, matches=changed,
+                        built_at=datetime.datetime.now(datetime.timezone.utc).isoformat(timespec='seconds'))
+        _write_json(os.path.join(base, name, SNAPSHOT_META), snapshot)
+        _write_json(os.path.join(base, CURRENT), snapshot)
+        event['snapshot'] = name
+        prune_snapshots(root, keep)
+        return snapshot
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Refresh the data in the background and publish it as a '
+                                                 'new snapshot for the app.')
+    parser.add_argument('--data-dir', default=ingest.DATA_DIR)
+    parser.add_argument('--root', default='.', help='directory the app runs in')
+    parser.add_argument('--formats', nargs='+', choices=list(ingest.FORMATS), default=list(ingest.FORMATS))
+    parser.add_argument('--workers', type=int, default=None)
+    parser.add_argument('--memory-budget', type=int, default=None, help='MB of rows in flight per table load')
+    parser.add_argument('--keep', type=int, default=KEEP, help='snapshots to keep on disk')
+    parser.add_argument('--no-figures', action='store_true', help='do not pre-render the charts')
+    parser.add_argument('--force', action='store_true', help='publish a snapshot even if nothing changed')
+    parser.add_argument('--interval', type=float, default=None,
+                        help='keep running, refreshing every INTERVAL seconds')
+    args = parser.parse_args(argv)
+    budget = args.memory_budget * 1024 * 1024 if args.memory_budget else None
+    while True:
+        start = time.perf_counter()
+        snapshot = refresh(args.data_dir, args.root, args.formats, args.workers, budget, args.keep,
+                           not args.no_figures, args.force)
+        print(f"Serving snapshot {snapshot['name']} (data version {snapshot['version']}, "
+              f"{snapshot['matches']} new or changed matches) after {time.perf_counter() - start:.1f}s")
+        if args.interval is None:
+            return
+        args.force = False
+        time.sleep(args.interval)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,201 @@
+import argparse
+import datetime
+import json
+import multiprocessing
+import os
+import sys
+import time
+import traceback
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import storage
+from backends import BACKENDS, configured_backend, open_backend
+from db_build import DB_PATH, build_database
+from queries import QUEST, run_query
+from refresh import current, paths
+
+REPORT_DIR = 'reports'
+TABLE_FORMATS = ('csv', 'parquet')
+SUMMARY = 'summary.json'
+
+# Per-process state, opened once by the pool initializer and reused by every
+# task the process runs
+_backend = None
+_data = None
+_options = None
+
+
+def _init(backend, db_path, store_dir, window, out_dir, table_formats, image_formats):
+    global _backend, _data, _options
+    from dataset import load_dataset
+
+    _backend = open_backend(backend, db_path, store_dir)
+    _data = load_dataset(store_dir, window=window or None)
+    _options = {'window': window or None, 'out_dir': out_dir, 'table_formats': table_formats,
+                'image_formats': image_formats}
+
+
+def file_name(name):
+    return name.lower().replace(' ', '_')
+
+
+def _question(fmt, qid):
+    df = run_query(_backend, fmt, qid, window=_options['window'], data=_data)
+    files = []
+    for ext in _options['table_formats']:
+        path = os.path.join(_options['out_dir'], 'questions', f'{file_name(f"{fmt} {qid}")}.{ext}')
+        if ext == 'csv':
+            df.to_csv(path, index=False)
+        else:
+            df.to_parquet(path, index=False)
+        files.append(path)
+    return {'rows': len(df), 'files': files}
+
+
+def _chart(chart):
+    from charts import render
+    from figure_cache import save_figure
+
+    fig = render(chart, _data)
+    files = []
+    for ext in _options['image_formats']:
+        path = os.path.join(_options['out_dir'], 'charts', f'{file_name(chart)}.{ext}')
+        save_figure(fig, path, ext)
+        files.append(path)
+    return {'files': files}
+
+
+def run_task(task):
+    """Run one question or chart in a pool process; never raises, so one
+    failure does not stop the report."""
+    kind, name = task[0], ' '.join(task[1:])
+    start = time.perf_counter()
+    try:
+        result = _question(*task[1:]) if kind == 'question' else _chart(*task[1:])
+        result['status'] = 'ok'
+    except Exception as e:
+        result = {'status': 'failed', 'error': f'{type(e).__name__}: {e}', 'traceback': traceback.format_exc()}
+    return {'kind': kind, 'name': name, 'seconds': round(time.perf_counter() - start, 4),
+            'pid': os.getpid(), **result}
+
+
+def select_tasks(questions=None, charts=None):
+    """Expand the selection into tasks, charts first.
+
+    ``questions`` holds catalog tabs (``odi``) or single questions (``odi:Q2``)
+    and ``charts`` chart numbers; an empty list selects the whole group and
+    None skips it. With both None everything runs.
+    """
+    from charts import CHARTS
+
+    if questions is None and charts is None:
+        questions, charts = [], []
+    formats = {fmt.lower(): fmt for fmt in QUEST}
+    tasks = []
+    # charts take longest, so they start first and the questions fill in
+    if charts is not None:
+        names = [f'Chart {n}' for n in charts] or list(CHARTS)
+        unknown = [n for n in names if n not in CHARTS]
+        if unknown:
+            raise ValueError(f"unknown charts: {', '.join(unknown)}")
+        tasks += [('chart', name) for name in names]
+    if questions is not None:
+        for spec in questions or list(QUEST):
+            fmt, _, qid = spec.partition(':')
+            fmt, qid = formats.get(fmt.lower()), qid.upper()
+            if fmt is None or (qid and qid not in QUEST[fmt]):
+                raise ValueError(f'unknown question: {spec}')
+            tasks += [('question', fmt, q) for q in ([qid] if qid else QUEST[fmt])]
+    return tasks
+
+
+def run_report(out_dir, tasks, backend=None, db_path=DB_PATH, store_dir=storage.STORE_DIR, window=None,
+               workers=None, table_formats=('csv',), image_formats=('png',)):
+    """Run ``tasks`` across a process pool and write their outputs and a run
+    summary into ``out_dir``; returns the summary."""
+    for sub in ('questions', 'charts'):
+        os.makedirs(os.path.join(out_dir, sub), exist_ok=True)
+    backend = (backend or configured_backend()).lower()
+    probe = open_backend(backend, db_path, store_dir)
+    version = probe.version()
+    probe.dispose()
+    workers = min(workers or os.cpu_count() or 1, len(tasks)) or 1
+    started_at = datetime.datetime.now(datetime.timezone.utc).isoformat(timespec='seconds')
+    start = time.perf_counter()
+    results = []
+    # spawned, not forked: workers must not inherit the caller's threads
+    # (pools, connections) or locks they might be holding
+    with ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context('spawn'),
+                             initializer=_init, initargs=(backend, db_path, store_dir, window, out_dir,
+                                                          table_formats, image_formats)) as pool:
+        for future in as_completed([pool.submit(run_task, task) for task in tasks]):
+            results.append(future.result())
+    wall = time.perf_counter() - start
+    order = {' '.join(task[1:]): i for i, task in enumerate(tasks)}
+    results.sort(key=lambda r: order[r['name']])
+    for r in results:
+        if r['kind'] == 'question':
+            fmt, qid = r['name'].split()
+            r['question'] = QUEST[fmt][qid]
+    busy = sum(r['seconds'] for r in results)
+    summary = {'started_at': started_at,
+               'data_version': version, 'backend': backend, 'db': db_path, 'store_dir': store_dir,
+               'window': {'seasons': list(window.seasons) if window and window.seasons else None,
+                          'start': str(window.start) if window and window.start else None,
+                          'end': str(window.end) if window and window.end else None},
+               'workers': workers, 'tasks': len(results),
+               'failed': sum(r['status'] != 'ok' for r in results),
+               'wall_seconds': round(wall, 3), 'task_seconds': round(busy, 3),
+               'speedup': round(busy / wall, 2) if wall else None, 'results': results}
+    with open(os.path.join(out_dir, SUMMARY), 'w', encoding='utf-8') as f:
+        json.dump(summary, f, indent=1)
+    return summary
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Run the question catalog and the charts without the UI and '
+                                                 'write the results into a report directory.')
+    parser.add_argument('--out-dir', default=None, help=f'default: {REPORT_DIR}/<UTC timestamp>')
+    parser.add_argument('--questions', nargs='*', default=None, metavar='FMT[:QID]',
+                        help='run these formats or questions (all if none are given)')
+    parser.add_argument('--charts', nargs='*', type=int, default=None, metavar='N',
+                        help='render these chart numbers (all if none are given)')
+    parser.add_argument('--workers', type=int, default=None)
+    parser.add_argument('--backend', choices=BACKENDS, default=configured_backend())
+    parser.add_argument('--root', default='.', help='directory holding the data or refresh snapshots')
+    parser.add_argument('--db', default=None, help='read this database instead of the served snapshot')
+    parser.add_argument('--table-formats', nargs='+', choices=TABLE_FORMATS, default=['csv'])
+    parser.add_argument('--image-formats', nargs='+', choices=('png', 'svg'), default=['png'])
+    parser.add_argument('--seasons', nargs='+', default=None)
+    parser.add_argument('--start', type=datetime.date.fromisoformat, default=None, help='YYYY-MM-DD')
+    parser.add_argument('--end', type=datetime.date.fromisoformat, default=None, help='YYYY-MM-DD')
+    parser.add_argument('--no-build', action='store_true',
+                        help='report from the existing database without rebuilding stale tables')
+    args = parser.parse_args(argv)
+
+    try:
+        tasks = select_tasks(args.questions, args.charts)
+    except ValueError as e:
+        parser.error(str(e))
+    snapshot = None if args.db else current(args.root)
+    db_path, store_dir = paths(snapshot, args.root)
+    db_path = args.db or db_path
+    if snapshot is None and args.backend == 'sqlite' and not args.no_build:
+        build_database(db_path, args.root)
+    out_dir = args.out_dir or os.path.join(
+        REPORT_DIR, datetime.datetime.now(datetime.timezone.utc).strftime('%Y%m%dT%H%M%SZ'))
+    window = storage.Window(tuple(args.seasons) if args.seasons else None, args.start, args.end)
+
+    summary = run_report(out_dir, tasks, args.backend, db_path, store_dir, window, args.workers,
+                         args.table_formats, args.image_formats)
+    for r in summary['results']:
+        detail = f"{r['rows']} rows" if 'rows' in r else r.get('error', '')
+        print(f"{r['status']:6} {r['seconds']:8.3f}s  {r['kind']:8} {r['name']:10} {detail}")
+    print(f"{summary['tasks']} tasks, {summary['failed']} failed, data version {summary['data_version']}: "
+          f"{summary['wall_seconds']}s on {summary['workers']} workers "
+          f"({summary['task_seconds']}s of work) -> {out_dir}")
+    return 1 if summary['failed'] else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,362 @@
+import datetime
+import hashlib
+import os
+import uuid
+from dataclasses import dataclass
+from urllib.parse import quote, unquote
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.dataset as ds
+import pyarrow.parquet as pq
+
+STORE_DIR = 'cricket_store'
+
+KINDS = ('summary', 'innings')
+
+SCHEMAS = {
+    'summary': pa.schema([
+        ('match_id', pa.int64()),
+        ('match_type', pa.string()),
+        ('season', pa.string()),
+        ('venue', pa.string()),
+        ('city', pa.string()),
+        ('start_date', pa.date32()),
+        ('end_date', pa.date32()),
+        ('duration_days', pa.int16()),
+        ('team_1', pa.string()),
+        ('team_2', pa.string()),
+        ('toss_winner', pa.string()),
+        ('toss_decision', pa.string()),
+        ('winner', pa.string()),
+        ('player_of_match', pa.string()),
+    ]),
+    'innings': pa.schema([
+        ('match_id', pa.int64()),
+        ('inning_team', pa.string()),
+        ('over', pa.int16()),
+        ('ball_number', pa.float32()),
+        ('batsman', pa.string()),
+        ('bowler', pa.string()),
+        ('non_striker', pa.string()),
+        ('runs_scored', pa.int16()),
+        ('extras', pa.int16()),
+        ('total_runs', pa.int16()),
+        ('wicket_type', pa.string()),
+        ('player_out', pa.string()),
+    ]),
+}
+
+# Rows per Parquet row group; readers decode a row group at a time, so this
+# bounds the memory needed to stream a part file
+ROW_GROUP_ROWS = 65536
+
+
+def csv_path(kind, fmt, csv_dir='.'):
+    return os.path.join(csv_dir, f'{fmt}_matches_{kind}.csv')
+
+
+def partition_dir(kind, fmt, store_dir=STORE_DIR):
+    return os.path.join(store_dir, kind, f'format={fmt}')
+
+
+def season_dir(kind, fmt, season, store_dir=STORE_DIR):
+    """Each format is split into one directory per season, e.g.
+    ``innings/format=odi/season=2019%2F20``."""
+    return os.path.join(partition_dir(kind, fmt, store_dir), f'season={quote(str(season), safe="")}')
+
+
+def _season_of(part):
+    """Season of a part file, or None for a part written before the store was
+    split by season (these are read by every window)."""
+    name = os.path.basename(os.path.dirname(part))
+    return unquote(name[len('season='):]) if name.startswith('season=') else None
+
+
+def parts(kind, fmt, store_dir=STORE_DIR, seasons=None):
+    """Part files of a format, optionally only those of the given seasons."""
+    path = partition_dir(kind, fmt, store_dir)
+    if not os.path.isdir(path):
+        return []
+    found = []
+    for root, dirs, files in os.walk(path):
+        dirs.sort()
+        found.extend(os.path.join(root, f) for f in sorted(files) if f.endswith('.parquet'))
+    if seasons is not None:
+        seasons = set(seasons)
+        found = [p for p in found if _season_of(p) is None or _season_of(p) in seasons]
+    return found
+
+
+def exists(kind, fmt, store_dir=STORE_DIR):
+    return os.path.isdir(partition_dir(kind, fmt, store_dir))
+
+
+def to_table(kind, df):
+    """Convert a frame with the ingestion columns to the typed schema."""
+    df = df.copy()
+    df['match_id'] = pd.to_numeric(df['match_id'])
+    if kind == 'summary':
+        for col in ('start_date', 'end_date'):
+            df[col] = pd.to_datetime(df[col], errors='coerce').dt.date
+    return pa.Table.from_pandas(df, schema=SCHEMAS[kind], preserve_index=False)
+
+
+def write_batch(kind, fmt, df, seasons, store_dir=STORE_DIR):
+    """Write one batch as new immutable part files, one per season.
+
+    ``seasons`` gives the season of every row (for the innings, the season
+    of the row's match).
+    """
+    seasons = pd.Series(seasons, index=df.index).astype(str)
+    for season, rows in df.groupby(seasons, sort=True).groups.items():
+        path = season_dir(kind, fmt, season, store_dir)
+        os.makedirs(path, exist_ok=True)
+        pq.write_table(to_table(kind, df.loc[rows]), os.path.join(path, f'part-{uuid.uuid4().hex}.parquet'),
+                       row_group_size=ROW_GROUP_ROWS)
+
+
+def write_matches(fmt, summary, innings, store_dir=STORE_DIR):
+    """Write a batch of parsed matches to the season partitions of a format."""
+    season = summary.set_index(summary['match_id'].astype(str))['season'].astype(str)
+    write_batch('summary', fmt, summary, summary['season'], store_dir)
+    write_batch('innings', fmt, innings, innings['match_id'].astype(str).map(season), store_dir)
+
+
+def clear(kind, fmt, store_dir=STORE_DIR):
+    for part in parts(kind, fmt, store_dir):
+        os.remove(part)
+    path = partition_dir(kind, fmt, store_dir)
+    for root, dirs, _ in os.walk(path, topdown=False):
+        for d in dirs:
+            os.rmdir(os.path.join(root, d))
+    os.makedirs(path, exist_ok=True)
+
+
+def drop_matches(kind, fmt, match_ids, store_dir=STORE_DIR):
+    """Rewrite only the part files that contain rows of the given matches."""
+    ids = pa.array(sorted(int(m) for m in match_ids), pa.int64())
+    for part in parts(kind, fmt, store_dir):
+        found = pq.read_table(part, columns=['match_id'])['match_id']
+        if not pc.any(pc.is_in(found, ids)).as_py():
+            continue
+        table = pq.read_table(part)
+        table = table.filter(pc.invert(pc.is_in(table['match_id'], ids)))
+        if table.num_rows:
+            pq.write_table(table, os.path.join(os.path.dirname(part),
+                                               f'part-{uuid.uuid4().hex}.parquet'),
+                           row_group_size=ROW_GROUP_ROWS)
+        os.remove(part)
+
+
+@dataclass(frozen=True)
+class Window:
+    """A time window over the matches: a set of seasons and/or an inclusive
+    range of start dates. Empty fields do not restrict anything."""
+    seasons: tuple = None
+    start: datetime.date = None
+    end: datetime.date = None
+
+    def __bool__(self):
+        return self.seasons is not None or self.start is not None or self.end is not None
+
+    def key(self):
+        """Short stable name of the window, for cache keys and file names."""
+        if not self:
+            return 'all'
+        text = repr((sorted(self.seasons) if self.seasons is not None else None, str(self.start), str(self.end)))
+        return hashlib.sha256(text.encode()).hexdigest()[:12]
+
+    def expression(self):
+        """Row filter on the summary columns, or None."""
+        expr = None
+        for part in (pc.field('season').isin(list(self.seasons)) if self.seasons is not None else None,
+                     pc.field('start_date') >= pa.scalar(self.start, pa.date32()) if self.start else None,
+                     pc.field('start_date') <= pa.scalar(self.end, pa.date32()) if self.end else None):
+            if part is not None:
+                expr = part if expr is None else expr & part
+        return expr
+
+
+STAT_COLUMNS = ['matches', 'deliveries', 'parts', 'bytes', 'first_date', 'last_date']
+_footers = {}
+
+
+def _footer(part):
+    """Row count, size and start_date range of a part file, from its footer.
+
+    Part files are immutable, so footers are cached by path.
+    """
+    if part not in _footers:
+        meta = pq.ParquetFile(part).metadata
+        first = last = None
+        names = meta.schema.names
+        if 'start_date' in names:
+            col = names.index('start_date')
+            for i in range(meta.num_row_groups):
+                stats = meta.row_group(i).column(col).statistics
+                if stats is not None and stats.has_min_max:
+                    first = stats.min if first is None else min(first, stats.min)
+                    last = stats.max if last is None else max(last, stats.max)
+        _footers[part] = (meta.num_rows, os.path.getsize(part), first, last)
+    return _footers[part]
+
+
+def partition_stats(fmt, store_dir=STORE_DIR):
+    """Per-season statistics of a format, read from the part file footers:
+    matches, deliveries, bytes on disk and the range of start dates."""
+    stats = {}
+    for kind in KINDS:
+        for part in parts(kind, fmt, store_dir):
+            rows, size, first, last = _footer(part)
+            entry = stats.setdefault(_season_of(part), dict.fromkeys(STAT_COLUMNS[:4], 0)
+                                     | dict.fromkeys(STAT_COLUMNS[4:]))
+            entry['matches' if kind == 'summary' else 'deliveries'] += rows
+            entry['parts'] += 1
+            entry['bytes'] += size
+            if first is not None:
+                entry['first_date'] = first if entry['first_date'] is None else min(entry['first_date'], first)
+                entry['last_date'] = last if entry['last_date'] is None else max(entry['last_date'], last)
+    return pd.DataFrame.from_dict(stats, orient='index', columns=STAT_COLUMNS).rename_axis('season').reset_index()
+
+
+def seasons(fmt, store_dir=STORE_DIR):
+    """Seasons present in a format's store partition."""
+    return sorted({_season_of(p) for p in parts('summary', fmt, store_dir)} - {None})
+
+
+def prune(kind, fmt, window, store_dir=STORE_DIR):
+    """Part files that can hold rows of ``window``.
+
+    Seasons outside the window are skipped by directory; for a date range,
+    seasons whose start dates (from the footers) miss the range are skipped
+    too. Parts written before the season split are always kept.
+    """
+    if not window:
+        return parts(kind, fmt, store_dir)
+    keep = set(window.seasons) if window.seasons is not None else None
+    if window.start or window.end:
+        stats = partition_stats(fmt, store_dir).dropna(subset=['first_date'])
+        overlap = stats['season'].notna()
+        if window.start:
+            overlap &= stats['last_date'] >= window.start
+        if window.end:
+            overlap &= stats['first_date'] <= window.end
+        in_range = set(stats.loc[overlap, 'season'])
+        keep = in_range if keep is None else keep & in_range
+    return parts(kind, fmt, store_dir, keep)
+
+
+def dataset(kind, fmt, store_dir=STORE_DIR, files=None):
+    """Arrow dataset over a format's part files (all of them by default)."""
+    files = parts(kind, fmt, store_dir) if files is None else files
+    return ds.dataset(files, schema=SCHEMAS[kind], format='parquet')
+
+
+def _expression(filters):
+    if filters is None or isinstance(filters, ds.Expression):
+        return filters
+    return pq.filters_to_expression(filters)
+
+
+def _and(a, b):
+    return b if a is None else a if b is None else a & b
+
+
+def pruned_exactly(kind, fmt, window, store_dir):
+    """Whether the season partitions alone select exactly the window's rows."""
+    return (window.start is None and window.end is None and exists(kind, fmt, store_dir)
+            and all(_season_of(p) is not None for p in parts(kind, fmt, store_dir)))
+
+
+def window_matches(fmt, window, store_dir=STORE_DIR, csv_dir='.'):
+    """Match ids of a format that fall in ``window``."""
+    return read_table('summary', fmt, ['match_id'], window=window, store_dir=store_dir,
+                      csv_dir=csv_dir)['match_id']
+
+
+def read_table(kind, fmt, columns=None, filters=None, store_dir=STORE_DIR, csv_dir='.', window=None):
+    """Read one format as an Arrow table with column projection and predicate pushdown.
+
+    ``filters`` is either a pyarrow expression or a list of
+    ``(column, op, value)`` tuples. Only the selected columns are decoded,
+    and row groups whose statistics cannot match are skipped. A ``window``
+    reads only the season partitions it can match (see prune); innings
+    rows are then kept for the matches the summary puts in the window.
+    When the store has not been built yet the CSV export is read instead.
+    """
+    expr = _expression(filters)
+    if window and kind == 'summary':
+        expr = _and(expr, window.expression())
+    elif window and not pruned_exactly(kind, fmt, window, store_dir):
+        expr = _and(expr, pc.field('match_id').isin(window_matches(fmt, window, store_dir, csv_dir)))
+    if exists(kind, fmt, store_dir):
+        files = prune(kind, fmt, window, store_dir)
+        return dataset(kind, fmt, store_dir, files).to_table(columns=columns or SCHEMAS[kind].names, filter=expr)
+    dates = ['start_date', 'end_date'] if kind == 'summary' else None
+    df = pd.read_csv(csv_path(kind, fmt, csv_dir), usecols=None if window else columns, parse_dates=dates)
+    if window and kind == 'summary':
+        df['season'] = df['season'].astype(str)
+        df['start_date'] = df['start_date'].dt.date
+    table = pa.Table.from_pandas(df, preserve_index=False)
+    table = table if expr is None else table.filter(expr)
+    return table.select(columns) if columns else table
+
+
+def load(kind, fmt, columns=None, filters=None, store_dir=STORE_DIR, csv_dir='.', window=None):
+    """Like read_table, but returns a pandas DataFrame with datetime64 dates."""
+    table = read_table(kind, fmt, columns, filters, store_dir, csv_dir, window)
+    return table.to_pandas(date_as_object=False)
+
+
+def iter_part(path, rows):
+    """Yield a part file as DataFrames of at most ``rows`` rows."""
+    for batch in pq.ParquetFile(path).iter_batches(batch_size=rows):
+        yield batch.to_pandas(date_as_object=False)
+
+
+def iter_csv(kind, fmt, rows, csv_dir='.'):
+    """Yield a CSV export as DataFrames of at most ``rows`` rows."""
+    dates = ['start_date', 'end_date'] if kind == 'summary' else None
+    yield from pd.read_csv(csv_path(kind, fmt, csv_dir), chunksize=rows, parse_dates=dates)
+
+
+def sample(kind, fmt, rows=1000, store_dir=STORE_DIR, csv_dir='.'):
+    """Return up to ``rows`` leading rows of a format, for sizing chunks."""
+    if exists(kind, fmt, store_dir):
+        for part in parts(kind, fmt, store_dir):
+            return next(iter_part(part, rows), pd.DataFrame(columns=SCHEMAS[kind].names))
+        return pd.DataFrame(columns=SCHEMAS[kind].names)
+    return next(iter_csv(kind, fmt, rows, csv_dir), pd.DataFrame(columns=SCHEMAS[kind].names))
+
+
+def export_csv(kind, fmt, csv_dir='.', store_dir=STORE_DIR):
+    """Stream a format's partition out to the legacy CSV layout."""
+    path = csv_path(kind, fmt, csv_dir)
+    first = True
+    scanner = dataset(kind, fmt, store_dir).scanner(columns=SCHEMAS[kind].names)
+    for batch in scanner.to_batches():
+        if not batch.num_rows and not first:
+            continue
+        batch.to_pandas().to_csv(path, mode='w' if first else 'a', header=first, index=False)
+        first = False
+    if first:
+        pd.DataFrame(columns=SCHEMAS[kind].names).to_csv(path, index=False)
+    return path
+
+
+def fingerprint(kind, fmt, store_dir=STORE_DIR):
+    """Return (size, mtime_ns, digest) for a partition.
+
+    Part files are immutable and uniquely named, so hashing the listing of
+    names and sizes identifies the partition's content.
+    """
+    h = hashlib.sha256()
+    size = mtime = 0
+    for part in parts(kind, fmt, store_dir):
+        st = os.stat(part)
+        size += st.st_size
+        mtime = max(mtime, st.st_mtime_ns)
+        h.update(f'{os.path.basename(part)}:{st.st_size}\n'.encode())
+    return (size, mtime, h.hexdigest())
@@ -0,0 +1,168 @@
+import argparse
+
+import numpy as np
+import pandas as pd
+
+# Dismissals that are not credited to the bowler
+NOT_BOWLER_WICKETS = ('Not Out', 'run out', 'retired hurt', 'retired not out', 'retired out',
+                      'obstructing the field')
+
+
+def _codes(s):
+    """Return (integer codes, labels) for a categorical or plain column."""
+    if isinstance(s.dtype, pd.CategoricalDtype):
+        return s.cat.codes.to_numpy(), s.cat.categories
+    return pd.factorize(s)
+
+
+def match_order(innings):
+    """Positions that list the deliveries match by match, or None if they
+    already are.
+
+    The sort is stable on match_id, so each match keeps its deliveries in
+    the order they were stored, i.e. bowled. Neither the store nor a SQL
+    scan without ORDER BY promises anything about the order of matches.
+    """
+    match = innings['match_id'].to_numpy()
+    if (match[1:] >= match[:-1]).all():
+        return None
+    return np.argsort(match, kind='stable')
+
+
+def in_match_order(innings):
+    """The innings frame itself, or a copy in match order (see match_order)."""
+    order = match_order(innings)
+    return innings if order is None else innings.take(order)
+
+
+def innings_numbers(innings):
+    """Return (innings id, innings number within the match) for every delivery.
+
+    The ball data has no innings column. Taking the matches in match_id
+    order, a new innings starts where the match or the batting team
+    changes, or where (over, ball_number) goes backwards (a team that
+    follows on bats twice in a row). Innings ids increase with match_id.
+    """
+    n = len(innings)
+    order = match_order(innings)
+    pick = (lambda a: a) if order is None else (lambda a: a[order])
+    match = pick(innings['match_id'].to_numpy())
+    team = pick(_codes(innings['inning_team'])[0])
+    over = pick(innings['over'].to_numpy())
+    ball = pick(innings['ball_number'].to_numpy(dtype=np.float64))
+    new_match = np.ones(n, bool)
+    new_match[1:] = match[1:] != match[:-1]
+    new = new_match.copy()
+    new[1:] |= ((team[1:] != team[:-1]) | (over[1:] < over[:-1])
+                | ((over[1:] == over[:-1]) & (ball[1:] < ball[:-1])))
+    ids = np.cumsum(new)
+    number = ids - np.maximum.accumulate(np.where(new_match, ids, 0)) + 1
+    if order is not None:
+        # back from match order to the frame's row order
+        ids[order] = ids.copy()
+        number[order] = number.copy()
+    return ids, number
+
+
+def run_lengths(group, flag):
+    """Return (start, length) of each maximal run of True in ``flag``.
+
+    Runs never cross a change of ``group``; both arrays must be ordered so
+    that equal groups are contiguous.
+    """
+    n = len(flag)
+    new_group = np.ones(n, bool)
+    new_group[1:] = group[1:] != group[:-1]
+    previous = np.zeros(n, bool)
+    previous[1:] = flag[:-1]
+    start = flag & (new_group | ~previous)
+    starts = np.flatnonzero(start)
+    run = np.cumsum(start) - 1
+    return starts, np.bincount(run[flag], minlength=len(starts))
+
+
+def streaks(innings, player, flag, min_length=1):
+    """Every maximal streak of ``flag`` deliveries per player and innings.
+
+    Deliveries are grouped by innings (see innings_numbers), keeping their
+    stored order within it, then split by ``player`` (the column the streak
+    belongs to, e.g. bowler or batsman), so a bowler's streak carries over
+    between their overs and a batter's between the balls they face.
+    Returns one row per streak.
+    """
+    ids, number = innings_numbers(innings)
+    codes, names = _codes(innings[player])
+    key = ids.astype(np.int64) * (len(names) + 1) + codes
+    order = np.argsort(key, kind='stable')
+    group = key[order]
+    starts, lengths = run_lengths(group, np.asarray(flag, bool)[order])
+    keep = lengths >= min_length
+    first = order[starts[keep]]
+    last = order[starts[keep] + lengths[keep] - 1]
+    ball = innings['ball_number'].to_numpy(dtype=np.float64)
+    return pd.DataFrame({
+        'match_id': innings['match_id'].to_numpy()[first],
+        'innings': number[first],
+        'inning_team': np.asarray(innings['inning_team'].take(first), dtype=object),
+        player: np.asarray(names)[codes[first]],
+        'length': lengths[keep],
+        'from_ball': ball[first].round(1),
+        'to_ball': ball[last].round(1),
+    })
+
+
+def dot_ball_streaks(innings, min_length=1):
+    """Consecutive dot balls (no runs, no extras) bowled by each bowler."""
+    flag = (innings['runs_scored'].to_numpy() == 0) & (innings['extras'].to_numpy() == 0)
+    return streaks(innings, 'bowler', flag, min_length)
+
+
+def boundary_streaks(innings, min_length=1):
+    """Consecutive fours or sixes hit by each batter from the balls they faced."""
+    flag = np.isin(innings['runs_scored'].to_numpy(), (4, 6))
+    return streaks(innings, 'batsman', flag, min_length)
+
+
+def wicketless_spells(innings, min_length=1):
+    """Consecutive deliveries each bowler sent down without taking a wicket."""
+    flag = innings['wicket_type'].isin(NOT_BOWLER_WICKETS).to_numpy()
+    return streaks(innings, 'bowler', flag, min_length)
+
+
+def longest(found, n=10, per=('match_id', 'innings')):
+    """Top ``n`` streaks, keeping only the longest of each player within ``per``."""
+    player = found.columns[3]
+    best = found.sort_values(['length', 'match_id', 'innings', player],
+                             ascending=[False, True, True, True], kind='stable')
+    best = best.drop_duplicates(list(per) + [player])
+    return best.head(n).reset_index(drop=True)
+
+
+STREAKS = {
+    'dots': dot_ball_streaks,
+    'boundaries': boundary_streaks,
+    'wicketless': wicketless_spells,
+}
+
+
+def main(argv=None):
+    import time
+
+    from dataset import FORMATS, load_dataset
+
+    parser = argparse.ArgumentParser(description='List the longest streaks in the ball-by-ball data.')
+    parser.add_argument('streak', choices=list(STREAKS))
+    parser.add_argument('--formats', nargs='+', choices=FORMATS, default=list(FORMATS))
+    parser.add_argument('--top', type=int, default=10)
+    args = parser.parse_args(argv)
+    data = load_dataset()
+    for fmt in args.formats:
+        start = time.perf_counter()
+        found = STREAKS[args.streak](data.innings[fmt])
+        elapsed = time.perf_counter() - start
+        print(f'{fmt}: {len(found)} streaks in {elapsed:.3f}s')
+        print(longest(found, args.top).to_string(index=False))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,203 @@
+import argparse
+import datetime
+import json
+import os
+import random
+import zipfile
+
+from ingest import FORMATS
+
+# Roughly the size of the real Cricsheet archives; --scale multiplies these
+BASE_MATCHES = {'test': 880, 'odi': 2500, 't20': 3000}
+
+# fmt -> (match_type, overs per innings, innings per match, days, wicket
+# probability per ball, batter run weights for 0, 1, 2, 3, 4, 6)
+PROFILES = {
+    'test': ('Test', 150, 4, 5, 1 / 60, (62, 22, 5, 1, 8, 2)),
+    'odi': ('ODI', 50, 2, 1, 1 / 32, (48, 32, 7, 1, 9, 3)),
+    't20': ('T20', 20, 2, 1, 1 / 20, (38, 34, 8, 1, 13, 6)),
+}
+
+TEAMS = ['Afghanistan', 'Australia', 'Bangladesh', 'England', 'India', 'Ireland',
+         'Netherlands', 'New Zealand', 'Pakistan', 'Scotland', 'South Africa',
+         'Sri Lanka', 'West Indies', 'Zimbabwe']
+VENUES = [('Melbourne Cricket Ground', 'Melbourne'), ("Lord's", 'London'),
+          ('Eden Gardens', 'Kolkata'), ('Wankhede Stadium', 'Mumbai'),
+          ('Newlands', 'Cape Town'), ('Gaddafi Stadium', 'Lahore'),
+          ('R Premadasa Stadium', 'Colombo'), ('Basin Reserve', 'Wellington'),
+          ('Kensington Oval', 'Bridgetown'), ('Sharjah Cricket Stadium', None)]
+WICKET_KINDS = ['caught', 'bowled', 'lbw', 'run out', 'stumped', 'caught and bowled']
+WICKET_WEIGHTS = [58, 19, 14, 5, 3, 1]
+INITIALS = 'ABCDGHJKMNRSTVW'
+SURNAMES = ['Ahmed', 'Anderson', 'Babar', 'Boult', 'Buttler', 'Cummins', 'de Kock',
+            'Hasan', 'Holder', 'Jadeja', 'Kohli', 'Latham', 'Mendis', 'Nabi', 'Rashid',
+            'Root', 'Sharma', 'Smith', 'Southee', 'Starc', 'Stirling', 'Taylor',
+            'Warner', 'Williamson']
+SQUAD_SIZE = 20
+
+
+def squads(seed=0):
+    """Return {team: player names}; names are unique across teams."""
+    rng = random.Random(seed)
+    names = {}
+    for team in TEAMS:
+        players = set()
+        while len(players) < SQUAD_SIZE:
+            players.add(f'{rng.choice(INITIALS)} {rng.choice(SURNAMES)} ({team[:3].upper()})')
+        names[team] = sorted(players)
+    return names
+
+
+def _innings(rng, team, batters, bowlers, fielders, fmt, target=None):
+    _, max_overs, _, _, p_wicket, weights = PROFILES[fmt]
+    order = list(batters)
+    striker, non_striker, next_in = order[0], order[1], 2
+    runs = wickets = 0
+    overs = []
+    previous = None
+    for over in range(max_overs):
+        bowler = rng.choice([b for b in bowlers if b != previous])
+        previous = bowler
+        deliveries = []
+        legal = 0
+        while legal < 6:
+            delivery = {'batter': striker, 'bowler': bowler, 'non_striker': non_striker}
+            extras = {}
+            if rng.random() < 0.03:
+                extras['wides' if rng.random() < 0.7 else 'noballs'] = 1
+            elif rng.random() < 0.01:
+                extras['legbyes'] = 1
+            bat = 0 if 'wides' in extras or 'legbyes' in extras else \
+                rng.choices((0, 1, 2, 3, 4, 6), weights)[0]
+            extra = sum(extras.values())
+            delivery['runs'] = {'batter': bat, 'extras': extra, 'total': bat + extra}
+            if extras:
+                delivery['extras'] = extras
+            if 'wides' not in extras and 'noballs' not in extras:
+                legal += 1
+                if rng.random() < p_wicket:
+                    kind = rng.choices(WICKET_KINDS, WICKET_WEIGHTS)[0]
+                    out = non_striker if kind == 'run out' and rng.random() < 0.4 else striker
+                    wicket = {'player_out': out, 'kind': kind}
+                    if kind in ('caught', 'run out', 'stumped'):
+                        wicket['fielders'] = [{'name': rng.choice(fielders)}]
+                    delivery['wickets'] = [wicket]
+                    delivery['runs'] = {'batter': 0, 'extras': extra, 'total': extra}
+                    bat = 0
+            deliveries.append(delivery)
+            runs += delivery['runs']['total']
+            if 'wickets' in delivery:
+                wickets += 1
+                if wickets == 10:
+                    break
+                replacement = order[next_in]
+                next_in += 1
+                if delivery['wickets'][0]['player_out'] == striker:
+                    striker = replacement
+                else:
+                    non_striker = replacement
+            elif bat % 2:
+                striker, non_striker = non_striker, striker
+            if target is not None and runs >= target:
+                break
+        overs.append({'over': over, 'deliveries': deliveries})
+        striker, non_striker = non_striker, striker
+        if wickets == 10 or (target is not None and runs >= target):
+            break
+    return {'team': team, 'overs': overs}, runs, wickets
+
+
+def generate_match(fmt, match_no, seed=0, players=None):
+    """Return one Cricsheet-style match dict; deterministic in (fmt, match_no, seed)."""
+    rng = random.Random(f'{seed}:{fmt}:{match_no}')
+    players = players or squads(seed)
+    match_type, _, n_innings, days, _, _ = PROFILES[fmt]
+    teams = rng.sample(TEAMS, 2)
+    xi = {t: rng.sample(players[t], 11) for t in teams}
+    toss_winner = rng.choice(teams)
+    decision = rng.choice(['bat', 'field'])
+    batting_first = toss_winner if decision == 'bat' else next(t for t in teams if t != toss_winner)
+    order = [batting_first, next(t for t in teams if t != batting_first)]
+
+    innings, totals = [], {t: 0 for t in teams}
+    for i in range(n_innings):
+        team = order[i % 2]
+        other = order[(i + 1) % 2]
+        target = None
+        if i == n_innings - 1 and i > 0:
+            target = totals[other] - totals[team] + 1
+            if target <= 0:
+                break
+        inning, runs, _ = _innings(rng, team, xi[team], xi[other][-6:], xi[other], fmt, target)
+        innings.append(inning)
+        totals[team] += runs
+
+    start = datetime.date(2004, 1, 1) + datetime.timedelta(days=rng.randrange(20 * 365))
+    dates = [(start + datetime.timedelta(days=d)).isoformat() for d in range(days)]
+    if rng.random() < 0.03:
+        outcome = {'result': 'no result'}
+    elif fmt == 'test' and len(innings) == 4 and rng.random() < 0.25:
+        outcome = {'result': 'draw'}
+    elif totals[order[0]] == totals[order[1]]:
+        outcome = {'result': 'tie'}
+    else:
+        outcome = {'winner': max(teams, key=totals.get)}
+    venue, city = rng.choice(VENUES)
+    info = {
+        'balls_per_over': 6,
+        'dates': dates,
+        'gender': 'male',
+        'match_type': match_type,
+        'outcome': outcome,
+        'players': xi,
+        'season': str(start.year),
+        'team_type': 'international',
+        'teams': teams,
+        'toss': {'decision': decision, 'winner': toss_winner},
+        'venue': venue,
+    }
+    if city:
+        info['city'] = city
+    if fmt != 'test':
+        info['overs'] = PROFILES[fmt][1]
+    if 'winner' in outcome:
+        info['player_of_match'] = [rng.choice(xi[outcome['winner']])]
+    return {'meta': {'data_version': '1.1.0', 'created': dates[-1], 'revision': 1},
+            'info': info, 'innings': innings}
+
+
+def write_archive(fmt, path, matches, seed=0, first_id=1000001):
+    """Write ``matches`` generated matches into a Cricsheet-style zip archive."""
+    players = squads(seed)
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+    with zipfile.ZipFile(path, 'w', zipfile.ZIP_DEFLATED) as zf:
+        for i in range(matches):
+            data = generate_match(fmt, i, seed, players)
+            zf.writestr(f'{first_id + i}.json', json.dumps(data, separators=(',', ':')))
+    return path
+
+
+def generate(out_dir, scale=1.0, formats=tuple(FORMATS), seed=0):
+    """Write one archive per format; returns {fmt: number of matches}."""
+    counts = {}
+    for n, fmt in enumerate(formats):
+        counts[fmt] = max(1, round(BASE_MATCHES[fmt] * scale))
+        write_archive(fmt, os.path.join(out_dir, FORMATS[fmt]), counts[fmt], seed,
+                      first_id=1000001 + n * 10_000_000)
+    return counts
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Write synthetic Cricsheet JSON archives.')
+    parser.add_argument('--out-dir', default='synthetic_data')
+    parser.add_argument('--scale', type=float, default=1.0,
+                        help='multiple of the real archive sizes (%s)' % BASE_MATCHES)
+    parser.add_argument('--formats', nargs='+', choices=list(FORMATS), default=list(FORMATS))
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args(argv)
+    for fmt, n in generate(args.out_dir, args.scale, args.formats, args.seed).items():
+        print(f'{fmt}: {n} matches -> {os.path.join(args.out_dir, FORMATS[fmt])}')
+
+
+if __name__ == '__main__':
+    main()